@@ -0,0 +1,72 @@
+"""
+Бенчмарк разбора callback_data.
+
+Сравнивает штатный путь aiogram — каждый CallbackData.filter() по очереди вызывает
+unpack() с валидацией pydantic, пока не найдется подходящий, — с разбором один раз
+через таблицу префиксов (tgbot.services.callbacks) без кеша строк.
+
+Использование:
+    python benchmarks/callbacks.py --number 20000
+"""
+
+import argparse
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tgbot.keyboards.admin.stats_extract import MonthStatsExtract  # noqa: E402
+from tgbot.keyboards.group.events import RemovedUser  # noqa: E402
+from tgbot.keyboards.group.main import QuestionQualityDuty  # noqa: E402
+from tgbot.keyboards.user.main import ReturnQuestion  # noqa: E402
+from tgbot.services.callbacks import _decode_cached, _decoders  # noqa: E402
+
+TOKEN = str(uuid.uuid4())
+
+CASES = (
+    QuestionQualityDuty(answer=True, token=TOKEN).pack(),
+    ReturnQuestion(action="show", token=TOKEN).pack(),
+    MonthStatsExtract(menu="month", month=5, year=2025).pack(),
+    RemovedUser(action="change_role", user_id=123456789, role=3).pack(),
+)
+
+
+def aiogram_path(data: str):
+    """Перебор фильтров в порядке регистрации, как при проходе по роутерам."""
+    for decoder in _decoders.values():
+        try:
+            return decoder.callback_cls.unpack(data)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def prefix_path(data: str):
+    return _decode_cached.__wrapped__(data)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Кол-во вызовов")
+    args = parser.parse_args()
+
+    print(f"{'callback_data':<52} {'aiogram':>12} {'префиксы':>12} {'ускорение':>10}")
+    for data in CASES:
+        assert aiogram_path(data) == prefix_path(data), data
+
+        aiogram_us = timeit.timeit(lambda: aiogram_path(data), number=args.number)
+        prefix_us = timeit.timeit(lambda: prefix_path(data), number=args.number)
+        aiogram_us = aiogram_us / args.number * 1e6
+        prefix_us = prefix_us / args.number * 1e6
+        print(
+            f"{data:<52} {aiogram_us:>9.2f} мкс {prefix_us:>9.2f} мкс "
+            f"{aiogram_us / prefix_us:>9.1f}x"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
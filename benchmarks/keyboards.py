@@ -0,0 +1,74 @@
+"""
+Бенчмарк построения клавиатур.
+
+Сравнивает время сборки InlineKeyboardMarkup без кеша (через __wrapped__)
+и с кешем — так, как их получают хендлеры.
+
+Использование:
+    python benchmarks/keyboards.py --number 20000
+"""
+
+import argparse
+import sys
+import timeit
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tgbot.keyboards.admin.main import admin_kb  # noqa: E402
+from tgbot.keyboards.admin.stats_extract import _extract_kb, extract_kb  # noqa: E402
+from tgbot.keyboards.group.main import question_quality_duty_kb  # noqa: E402
+from tgbot.keyboards.user.main import (  # noqa: E402
+    back_kb,
+    finish_question_kb,
+    question_quality_specialist_kb,
+    user_kb,
+)
+
+TOKEN = str(uuid.uuid4())
+
+# (название, вызов без кеша, вызов с кешем)
+CASES = (
+    ("user_kb", lambda: user_kb.__wrapped__(), lambda: user_kb()),
+    ("back_kb", lambda: back_kb.__wrapped__(), lambda: back_kb()),
+    (
+        "finish_question_kb",
+        lambda: finish_question_kb.__wrapped__(),
+        lambda: finish_question_kb(),
+    ),
+    ("admin_kb", lambda: admin_kb.__wrapped__(), lambda: admin_kb()),
+    ("extract_kb", lambda: _extract_kb.__wrapped__(2025, 1), lambda: extract_kb()),
+    (
+        "question_quality_specialist_kb",
+        lambda: question_quality_specialist_kb.__wrapped__(TOKEN),
+        lambda: question_quality_specialist_kb(TOKEN),
+    ),
+    (
+        "question_quality_duty_kb",
+        lambda: question_quality_duty_kb.__wrapped__(TOKEN, True, True),
+        lambda: question_quality_duty_kb(TOKEN, True, True),
+    ),
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="Кол-во вызовов")
+    args = parser.parse_args()
+
+    print(f"{'Клавиатура':<32} {'без кеша':>12} {'с кешем':>12} {'ускорение':>10}")
+    for name, uncached, cached in CASES:
+        cached()  # прогрев кеша
+        uncached_us = timeit.timeit(uncached, number=args.number) / args.number * 1e6
+        cached_us = timeit.timeit(cached, number=args.number) / args.number * 1e6
+        print(
+            f"{name:<32} {uncached_us:>9.2f} мкс {cached_us:>9.2f} мкс "
+            f"{uncached_us / cached_us:>9.0f}x"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
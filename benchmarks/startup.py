@@ -0,0 +1,103 @@
+"""
+Бенчмарк холодного старта бота.
+
+Запускает `python -X importtime -c "import bot"` в отдельном процессе и проверяет,
+что тяжелые опциональные зависимости не импортируются при старте,
+а суммарное время импортов не превышает порога.
+
+Время до первого обработанного обновления пишет в лог сам бот
+("[Старт] Первое обновление обработано через ... мс после запуска").
+
+Использование:
+    python benchmarks/startup.py --max-import-ms 1500
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Модули, которые должны загружаться только при выгрузке статистики или работе с Google Sheets
+HEAVY_MODULES = (
+    "pandas",
+    "openpyxl",
+    "googleapiclient",
+    "gspread",
+    "google.auth",
+    "google.oauth2",
+)
+
+
+def measure_imports(module: str) -> tuple[float, list[tuple[int, str]], float]:
+    """
+    Импортирует модуль в чистом процессе с -X importtime.
+    :return: Суммарное self-время импортов (мс), список (cumulative мкс, модуль), общее время процесса (мс)
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        raise SystemExit(f"Не удалось импортировать {module}")
+
+    total_self_us = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        total_self_us += int(self_us)
+        modules.append((int(cumulative_us), name.strip()))
+
+    return total_self_us / 1000, modules, wall_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="bot", help="Импортируемый модуль")
+    parser.add_argument(
+        "--max-import-ms",
+        type=float,
+        default=None,
+        help="Порог суммарного времени импортов, при превышении код возврата 1",
+    )
+    parser.add_argument("--top", type=int, default=15, help="Сколько модулей показать")
+    args = parser.parse_args()
+
+    total_ms, modules, wall_ms = measure_imports(args.module)
+
+    print(f"Импорт {args.module}: {total_ms:.0f} мс (процесс целиком: {wall_ms:.0f} мс)")
+    print("Самые тяжелые модули (cumulative):")
+    for cumulative_us, name in sorted(modules, reverse=True)[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} мс  {name}")
+
+    failed = False
+
+    imported_names = {name for _, name in modules}
+    leaked = [
+        heavy
+        for heavy in HEAVY_MODULES
+        if any(name == heavy or name.startswith(f"{heavy}.") for name in imported_names)
+    ]
+    if leaked:
+        print(f"ОШИБКА: при старте импортируются тяжелые модули: {', '.join(leaked)}")
+        failed = True
+
+    if args.max_import_ms is not None and total_ms > args.max_import_ms:
+        print(f"ОШИБКА: импорт занял {total_ms:.0f} мс при пороге {args.max_import_ms:.0f} мс")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
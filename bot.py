@@ -1,20 +1,52 @@
 import asyncio
+import datetime
 import logging
+import signal
+import time
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
 from aiogram.types import BotCommand
 
-from tgbot.config import Config, load_config
+from infrastructure.database.setup import create_engine, create_session_pool
+from tgbot.config import Config, get_config, reload_config
 from tgbot.handlers import routers_list
+from tgbot.middlewares.album import AlbumMiddleware
+from tgbot.middlewares.callback_data import CallbackDataMiddleware
 from tgbot.middlewares.config import ConfigMiddleware
+from tgbot.middlewares.database import DatabaseMiddleware
+from tgbot.middlewares.lifecycle import InFlightMiddleware
 from tgbot.middlewares.message_pairing import MessagePairingMiddleware
+from tgbot.middlewares.ordering import ChatOrderingMiddleware
+from tgbot.middlewares.startup import FirstUpdateMiddleware
+from tgbot.misc.helpers import wait_background_tasks
+from tgbot.services.bootstrap import BotProfile, bootstrap_bot_profile
+from tgbot.services.cache import cache
+from tgbot.services.circuit_breaker import get_breaker, watch_engine
+from tgbot.services.edits import EditCoalescer
+from tgbot.services.events import event_writer
+from tgbot.services.g_sheets import forum_routing
+from tgbot.services.lifecycle import LifecycleManager
 from tgbot.services.logger import setup_logging
-from tgbot.services.scheduler import scheduler
+from tgbot.services.membership import (
+    MembershipTracker,
+    ModerationQueue,
+    forum_ids,
+    reconcile_memberships,
+)
+from tgbot.services.relay import CopyRelay
+from tgbot.services.scheduler import (
+    restore_pending_timers,
+    scheduler,
+    shutdown_scheduler,
+    sweep_inactive_questions,
+)
+from tgbot.services.topic_pool import TopicPool
+from tgbot.services.topics import topic_updates
 
-bot_config = load_config(".env")
+# Момент окончания импортов. Время самих импортов меряет benchmarks/startup.py
+STARTED_AT = time.perf_counter()
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +57,7 @@ def register_global_middlewares(
     bot: Bot,
     main_session_pool=None,
     questioner_session_pool=None,
+    lifecycle: LifecycleManager = None,
 ):
     """
     Register global middlewares for the given dispatcher.
@@ -35,8 +68,14 @@ def register_global_middlewares(
     :type dp: Dispatcher
     :param config: The configuration object from the loaded configuration.
     :param session_pool: Optional session pool object for the database using SQLAlchemy.
+    :param lifecycle: Optional lifecycle manager that tracks in-flight updates for graceful shutdown.
     :return: None
     """
+    if lifecycle:
+        dp.update.outer_middleware(InFlightMiddleware(lifecycle))
+
+    edit_coalescer = dp.get("edit_coalescer")
+
     middleware_types = [
         ConfigMiddleware(config),
     ]
@@ -47,7 +86,27 @@ def register_global_middlewares(
         dp.edited_message.outer_middleware(middleware_type)
         dp.chat_member.outer_middleware(middleware_type)
 
-    dp.edited_message.outer_middleware(MessagePairingMiddleware())
+    # chat_member обрабатывается без БД: у ChatMemberUpdated нет топика и ответа
+    database_middleware = DatabaseMiddleware(
+        config, bot, main_session_pool, questioner_session_pool
+    )
+    dp.message.outer_middleware(database_middleware)
+    dp.callback_query.outer_middleware(database_middleware)
+    dp.edited_message.outer_middleware(database_middleware)
+
+    dp.callback_query.outer_middleware(CallbackDataMiddleware())
+    dp.edited_message.outer_middleware(
+        MessagePairingMiddleware(coalescer=edit_coalescer)
+    )
+    dp.update.outer_middleware(FirstUpdateMiddleware(started_at=STARTED_AT))
+    # Части альбома собираются до очереди чата, иначе она не пропустит их, пока ждет первая,
+    # а сама пауза на сбор идет уже в очереди, чтобы альбом не обогнали следующие сообщения
+    album_middleware = AlbumMiddleware()
+    dp.update.outer_middleware(album_middleware)
+    dp.update.outer_middleware(
+        ChatOrderingMiddleware(concurrency=config.tg_bot.updates_concurrency)
+    )
+    dp.update.outer_middleware(album_middleware.wait)
 
 
 def get_storage(config):
@@ -62,43 +121,164 @@ def get_storage(config):
 
     """
     if config.tg_bot.use_redis:
-        return RedisStorage.from_url(
+        # redis-клиент нужен только с USE_REDIS, не тратим на него время запуска без него
+        from aiogram.fsm.storage.redis import DefaultKeyBuilder
+
+        from tgbot.services.storage import PipelinedRedisStorage
+
+        return PipelinedRedisStorage.from_url(
             config.redis.dsn(),
             key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=config.redis.state_ttl,
+            data_ttl=config.redis.data_ttl,
         )
     else:
         return MemoryStorage()
 
 
+def register_reload_signal():
+    """
+    Подписывает перечитывание несекретных настроек на SIGHUP.
+    На платформах без SIGHUP (Windows) ничего не делает.
+    """
+    if not hasattr(signal, "SIGHUP"):
+        return
+
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGHUP, reload_config)
+
+
 async def main():
-    setup_logging()
+    bot_config = get_config()
+    setup_logging(json_format=bot_config.tg_bot.log_json)
+    register_reload_signal()
 
     storage = get_storage(bot_config)
+    if getattr(storage, "redis", None) is not None:
+        # Общий кеш реплик живет в том же Redis, что и FSM
+        await cache.setup(storage.redis)
 
     bot = Bot(
         token=bot_config.tg_bot.token, default=DefaultBotProperties(parse_mode="HTML")
     )
-    await bot.set_my_commands(
-        commands=[
-            BotCommand(command="start", description="Главное меню"),
-            BotCommand(
-                command="release", description="Освободить вопрос (для старших)"
+    await bootstrap_bot_profile(
+        bot,
+        BotProfile(
+            commands=(
+                BotCommand(command="start", description="Главное меню"),
+                BotCommand(
+                    command="release", description="Освободить вопрос (для старших)"
+                ),
+                BotCommand(command="end", description="Закрыть вопрос"),
             ),
-            BotCommand(command="end", description="Закрыть вопрос"),
-        ]
+            name=bot_config.tg_bot.bot_name,
+            description=bot_config.tg_bot.bot_description,
+        ),
+        redis=getattr(storage, "redis", None),
     )
 
-    # TODO Установить универсальное название при запуске бота
-    # await bot.set_my_name(name="Вопросник")
+    main_engine = create_engine(bot_config.db, bot_config.db.main_db)
+    questioner_engine = create_engine(bot_config.db, bot_config.db.questioner_db)
+    main_session_pool = create_session_pool(main_engine)
+    questioner_session_pool = create_session_pool(questioner_engine)
+    # Запросы к STPMain идут через main_breaker.call, к вопроснику — из хендлеров
+    watch_engine(questioner_engine, get_breaker("QuestionerBot"))
+
+    lifecycle = LifecycleManager(deadline=bot_config.tg_bot.shutdown_timeout)
+
+    event_writer.setup(questioner_session_pool)
+    relay = CopyRelay(bot, questioner_session_pool)
+    membership = MembershipTracker()
+    membership.load()
+    moderation_queue = ModerationQueue(bot)
+    edit_coalescer = EditCoalescer(bot)
 
     dp = Dispatcher(storage=storage)
+    dp["relay"] = relay
+    dp["edit_coalescer"] = edit_coalescer
+    dp["membership"] = membership
+
+    topic_pool = None
+    if bot_config.tg_bot.topic_pool:
+        topic_pool = TopicPool(
+            bot,
+            forum_ids(bot_config),
+            min_size=bot_config.tg_bot.topic_pool_min,
+            max_size=bot_config.tg_bot.topic_pool_max,
+        )
+        topic_pool.load()
+    dp["topic_pool"] = topic_pool
 
     dp.include_routers(*routers_list)
 
-    register_global_middlewares(dp, bot_config, bot)
+    register_global_middlewares(
+        dp,
+        bot_config,
+        bot,
+        main_session_pool=main_session_pool,
+        questioner_session_pool=questioner_session_pool,
+        lifecycle=lifecycle,
+    )
 
+    # Порядок важен: сначала сбрасываются буферы и дорабатывает планировщик (им нужны пулы),
+    # потом закрываются пулы
+    lifecycle.on_shutdown("Буфер пересылки", relay.close)
+    lifecycle.on_shutdown("Очередь правок", edit_coalescer.close)
+    lifecycle.on_shutdown("Снятие кнопок", wait_background_tasks)
+    lifecycle.on_shutdown("Планировщик", shutdown_scheduler)
+    lifecycle.on_shutdown("Изменения топиков", topic_updates.close)
+    lifecycle.on_shutdown("Очередь блокировок", moderation_queue.close)
+    lifecycle.on_shutdown("Состав форумов", membership.close)
+    if topic_pool:
+        lifecycle.on_shutdown("Пул топиков", topic_pool.close)
+    lifecycle.on_shutdown("Журнал событий", event_writer.close)
+    lifecycle.on_shutdown("Пул БД STPMain", main_engine.dispose)
+    lifecycle.on_shutdown("Пул БД вопросника", questioner_engine.dispose)
+    lifecycle.on_shutdown("Кеш", cache.close)
+    lifecycle.on_shutdown("Хранилище FSM", storage.close)
+    dp.shutdown.register(lifecycle.shutdown)
+
+    if bot_config.tg_bot.membership_reconcile_minutes:
+        scheduler.add_job(
+            reconcile_memberships,
+            "interval",
+            minutes=bot_config.tg_bot.membership_reconcile_minutes,
+            args=[bot, bot_config, main_session_pool, membership, moderation_queue],
+            id="membership_reconcile",
+            replace_existing=True,
+        )
+    # Первое построение таблицы маршрутизации — сразу после старта, не задерживая поллинг
+    scheduler.add_job(
+        forum_routing.refresh,
+        "interval",
+        minutes=bot_config.tg_bot.routing_refresh_minutes,
+        args=[main_session_pool],
+        id="forum_routing_refresh",
+        next_run_time=datetime.datetime.now(tz=datetime.timezone.utc),
+        replace_existing=True,
+    )
+    if bot_config.tg_bot.activity_engine == "sweep":
+        scheduler.add_job(
+            sweep_inactive_questions,
+            "interval",
+            seconds=bot_config.tg_bot.activity_sweep_seconds,
+            args=[bot, questioner_session_pool],
+            id="activity_sweep",
+            # Следующий проход не начинается, пока не закончился предыдущий
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+        )
     scheduler.start()
+    if topic_pool:
+        topic_pool.refill()
+    restore_pending_timers(bot, questioner_session_pool)
 
+    logger.info(
+        "[Старт] Бот готов к поллингу через %.0f мс после запуска",
+        (time.perf_counter() - STARTED_AT) * 1000,
+    )
+    # allowed_updates по умолчанию собирается из зарегистрированных хендлеров, включая chat_member
     await dp.start_polling(bot)
 
 
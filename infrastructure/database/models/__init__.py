@@ -2,3 +2,5 @@ from .base import Base
 from .user import User
 from .question import Question
 from .pairs import MessagesPair
+from .event import QuestionEvent, QuestionEventRollup
+from .sla import QuestionSlaDaily
@@ -0,0 +1,63 @@
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Date, DateTime, Index, Integer, String, Unicode
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class QuestionEvent(Base):
+    """
+    Событие жизненного цикла вопроса. Таблица только дополняется
+
+    Attributes:
+        id (Mapped[int]): Идентификатор события.
+        question_token (Mapped[str]): Токен вопроса.
+        event (Mapped[str]): Тип события: opened, taken, released, message, closed, returned, rated.
+        occurred_at (Mapped[datetime]): Время события.
+        actor (Mapped[Optional[str]]): ФИО участника (дежурного или специалиста), если известно.
+        division (Mapped[Optional[str]]): Направление специалиста, задавшего вопрос.
+        value (Mapped[Optional[str]]): Данные события: направление сообщения, оценка, новый статус.
+    """
+
+    __tablename__ = "question_events"
+    __table_args__ = (
+        Index("ix_question_events_token", "question_token", "occurred_at"),
+        Index("ix_question_events_occurred_at", "occurred_at"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=True, nullable=False
+    )
+    question_token: Mapped[str] = mapped_column(String(255), nullable=False)
+    event: Mapped[str] = mapped_column(String(20), nullable=False)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    actor: Mapped[Optional[str]] = mapped_column(Unicode(255), nullable=True)
+    division: Mapped[Optional[str]] = mapped_column(Unicode(50), nullable=True)
+    value: Mapped[Optional[str]] = mapped_column(Unicode(50), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<QuestionEvent {self.id} {self.question_token} {self.event} {self.occurred_at} {self.actor} {self.division} {self.value}>"
+
+
+class QuestionEventRollup(Base):
+    """
+    Кол-во событий вопросов по дням и направлениям. Обновляется при записи событий
+
+    Attributes:
+        day (Mapped[date]): День события.
+        division (Mapped[str]): Направление ("" — не определено).
+        event (Mapped[str]): Тип события.
+        count (Mapped[int]): Кол-во событий.
+    """
+
+    __tablename__ = "question_event_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    division: Mapped[str] = mapped_column(Unicode(50), primary_key=True)
+    event: Mapped[str] = mapped_column(String(20), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<QuestionEventRollup {self.day} {self.division} {self.event} {self.count}>"
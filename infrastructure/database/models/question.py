@@ -1,7 +1,8 @@
 import datetime
 from typing import Optional
 
-from sqlalchemy import BIGINT, Boolean, DateTime, Integer, String, Unicode
+from sqlalchemy import BIGINT, Boolean, DateTime, Index, Integer, String, Unicode, text
+from sqlalchemy.dialects.mssql import DATETIME2
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base, TableNameMixin
@@ -28,6 +29,8 @@ class Question(Base, TableNameMixin):
         status (Mapped[Optional[str]]): Статус вопроса.
         allow_return ([Mapped[Optional[bool]]): Статус доступности вопроса к возврату
         activity_status_enabled (Mapped[Optional[bool]]): Персональная настройка статуса активности для топика (может быть None)
+        last_activity_at (Mapped[Optional[datetime]]): Время последней активности в открытом вопросе (None — вопрос не отслеживается).
+        activity_warned_at (Mapped[Optional[datetime]]): Время предупреждения о бездействии (None — предупреждения не было).
 
     Methods:
         __repr__(): Returns a string representation of the Question object.
@@ -40,6 +43,30 @@ class Question(Base, TableNameMixin):
     """
 
     __tablename__ = "questions"
+    __table_args__ = (
+        # Фильтрованные индексы для постраничного списка доступных к возврату вопросов
+        Index(
+            "ix_questions_returnable",
+            "end_time",
+            "token",
+            mssql_where=text("allow_return = 1 AND end_time IS NOT NULL"),
+        ),
+        Index(
+            "ix_questions_returnable_employee",
+            "employee_chat_id",
+            "end_time",
+            "token",
+            mssql_where=text("allow_return = 1 AND end_time IS NOT NULL"),
+        ),
+        # Индекс для поиска бездействующих вопросов. last_activity_at заполнено только
+        # у открытых отслеживаемых вопросов, поэтому индекс остается маленьким
+        Index(
+            "ix_questions_last_activity",
+            "last_activity_at",
+            "token",
+            mssql_where=text("last_activity_at IS NOT NULL"),
+        ),
+    )
 
     token: Mapped[str] = mapped_column(String(255), primary_key=True)
     group_id: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -59,6 +86,13 @@ class Question(Base, TableNameMixin):
     activity_status_enabled: Mapped[Optional[bool]] = mapped_column(
         Boolean, nullable=True, default=None
     )
+    # DATETIME2: ключ пачек поиска бездействия сравнивается точно, без округления до 3 мс
+    last_activity_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime().with_variant(DATETIME2(), "mssql"), nullable=True, default=None
+    )
+    activity_warned_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, default=None
+    )
 
     def __repr__(self):
         return f"<Question {self.token} {self.group_id} {self.topic_id} {self.topic_duty_fullname} {self.employee_fullname} {self.employee_chat_id} {self.employee_division} {self.question_text} {self.start_time} {self.end_time} {self.clever_link} {self.quality_employee} {self.quality_duty} {self.status} {self.allow_return} {self.activity_status_enabled}>"
@@ -0,0 +1,55 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Integer, Unicode
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+# Верхние границы корзин гистограмм времени в секундах. Последняя корзина — больше 60 минут
+SLA_BUCKETS = (60, 300, 900, 1800, 3600)
+
+
+class QuestionSlaDaily(Base):
+    """
+    Метрики SLA дежурного по направлению за день. Обновляются при записи событий вопросов
+
+    Attributes:
+        day (Mapped[date]): День события.
+        division (Mapped[str]): Направление специалиста ("" — не определено).
+        duty (Mapped[str]): ФИО дежурного ("" — вопрос не был взят).
+        responded_count (Mapped[int]): Кол-во вопросов с первым ответом в этот день.
+        first_response_seconds (Mapped[int]): Сумма времени до первого ответа в секундах.
+        closed_count (Mapped[int]): Кол-во закрытых вопросов.
+        handle_seconds (Mapped[int]): Сумма времени от открытия до закрытия в секундах.
+        first_response_bucket_N / handle_bucket_N (Mapped[int]): Гистограммы по границам SLA_BUCKETS.
+    """
+
+    __tablename__ = "question_sla_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    division: Mapped[str] = mapped_column(Unicode(50), primary_key=True)
+    duty: Mapped[str] = mapped_column(Unicode(255), primary_key=True)
+
+    responded_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_response_seconds: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0
+    )
+    closed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    handle_seconds: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    first_response_bucket_0: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_response_bucket_1: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_response_bucket_2: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_response_bucket_3: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_response_bucket_4: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_response_bucket_5: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    handle_bucket_0: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    handle_bucket_1: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    handle_bucket_2: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    handle_bucket_3: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    handle_bucket_4: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    handle_bucket_5: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<QuestionSlaDaily {self.day} {self.division} {self.duty} {self.responded_count} {self.closed_count}>"
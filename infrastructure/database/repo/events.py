@@ -0,0 +1,301 @@
+import logging
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Literal, Optional, Sequence
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from infrastructure.database.models import (
+    Question,
+    QuestionEvent,
+    QuestionEventRollup,
+    QuestionSlaDaily,
+)
+from infrastructure.database.models.sla import SLA_BUCKETS
+from infrastructure.database.repo.base import BaseRepo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DutySla:
+    """
+    Метрики SLA дежурного за период.
+    Время в секундах; перцентили — верхняя граница корзины гистограммы (None — больше 60 минут или нет данных).
+    """
+
+    duty: str
+    responded: int
+    closed: int
+    avg_first_response: Optional[float]
+    avg_handle: Optional[float]
+    first_response_p50: Optional[int]
+    first_response_p90: Optional[int]
+    handle_p50: Optional[int]
+    handle_p90: Optional[int]
+
+
+def _clip(value: Optional[str], column) -> Optional[str]:
+    # Источники (ФИО, направления, статусы) не ограничены по длине, колонки — ограничены
+    length = column.type.length
+    if value is None or length is None or len(value) <= length:
+        return value
+    return value[:length]
+
+
+def _sla_kind(event: dict) -> Optional[Literal["first_response", "handle"]]:
+    # Первый ответ — первое сообщение из топика специалисту, время работы — до закрытия
+    if event["event"] == "message" and event.get("value") == "topic_to_user":
+        return "first_response"
+    if event["event"] == "closed":
+        return "handle"
+    return None
+
+
+def _sla_increments(
+    events: Sequence[dict], questions: dict, responded: set[str]
+) -> dict[tuple[date, str, str], Counter]:
+    """Приращения метрик SLA по (день, направление, дежурный) для пачки событий."""
+    increments: dict[tuple[date, str, str], Counter] = defaultdict(Counter)
+    for event in events:
+        kind = _sla_kind(event)
+        question = questions.get(event["question_token"])
+        if kind is None or question is None or question.start_time is None:
+            continue
+        if kind == "first_response":
+            if event["question_token"] in responded:
+                continue
+            responded.add(event["question_token"])
+
+        seconds = max(
+            int((event["occurred_at"] - question.start_time).total_seconds()), 0
+        )
+        key = (
+            event["occurred_at"].date(),
+            event.get("division") or "",
+            _clip(question.topic_duty_fullname, QuestionSlaDaily.duty) or "",
+        )
+        counter = increments[key]
+        if kind == "first_response":
+            counter["responded_count"] += 1
+            counter["first_response_seconds"] += seconds
+        else:
+            counter["closed_count"] += 1
+            counter["handle_seconds"] += seconds
+        counter[f"{kind}_bucket_{bisect_left(SLA_BUCKETS, seconds)}"] += 1
+    return increments
+
+
+def _bucket_percentile(buckets: Sequence[int], quantile: float) -> Optional[int]:
+    """Верхняя граница корзины, в которую попадает перцентиль."""
+    total = sum(buckets)
+    if not total:
+        return None
+    cumulative = 0
+    for bound, count in zip(SLA_BUCKETS, buckets):
+        cumulative += count
+        if cumulative >= quantile * total:
+            return bound
+    return None
+
+
+class QuestionEventsRepo(BaseRepo):
+    async def _increment(self, model, keys: dict, increments: dict) -> None:
+        """
+        Увеличивает счетчики строки агрегата, создавая строку при ее отсутствии.
+        Если строку одновременно создала другая реплика, вставка откатывается до точки
+        сохранения и счетчики увеличиваются повторным UPDATE
+        :param model: Модель таблицы агрегата
+        :param keys: Значения первичного ключа строки
+        :param increments: Прибавляемые значения по колонкам
+        """
+        stmt = (
+            update(model)
+            .where(*(getattr(model, column) == value for column, value in keys.items()))
+            .values(
+                {
+                    column: getattr(model, column) + value
+                    for column, value in increments.items()
+                }
+            )
+        )
+        result = await self.session.execute(stmt)
+        if result.rowcount:
+            return
+
+        try:
+            async with self.session.begin_nested():
+                await self.session.execute(insert(model).values(**keys, **increments))
+        except IntegrityError:
+            await self.session.execute(stmt)
+
+    async def write_events(self, events: Sequence[dict]) -> None:
+        """
+        Запись пачки событий и обновление агрегатов (счетчики событий и метрики SLA)
+        одной транзакцией
+        :param events: Словари с полями QuestionEvent (без id)
+        """
+        if not events:
+            return
+
+        # Данные вопросов для направлений сообщений и метрик SLA — одним запросом на пачку
+        tokens = {
+            event["question_token"]
+            for event in events
+            if not event.get("division") or _sla_kind(event)
+        }
+        questions = {}
+        if tokens:
+            result = await self.session.execute(
+                select(
+                    Question.token,
+                    Question.employee_division,
+                    Question.start_time,
+                    Question.topic_duty_fullname,
+                ).where(Question.token.in_(tokens))
+            )
+            questions = {row.token: row for row in result.all()}
+            events = [
+                event
+                if event.get("division") or event["question_token"] not in questions
+                else {
+                    **event,
+                    "division": questions[event["question_token"]].employee_division,
+                }
+                for event in events
+            ]
+
+        events = [
+            {
+                **event,
+                "actor": _clip(event.get("actor"), QuestionEvent.actor),
+                "division": _clip(event.get("division"), QuestionEvent.division),
+                "value": _clip(event.get("value"), QuestionEvent.value),
+            }
+            for event in events
+        ]
+
+        # Вопросы, на которые уже ответили в прошлых пачках
+        responded = set()
+        response_tokens = {
+            event["question_token"]
+            for event in events
+            if _sla_kind(event) == "first_response"
+        }
+        if response_tokens:
+            result = await self.session.execute(
+                select(QuestionEvent.question_token)
+                .where(
+                    QuestionEvent.question_token.in_(response_tokens),
+                    QuestionEvent.event == "message",
+                    QuestionEvent.value == "topic_to_user",
+                )
+                .distinct()
+            )
+            responded = set(result.scalars().all())
+
+        await self.session.execute(insert(QuestionEvent), list(events))
+
+        counts = Counter(
+            (event["occurred_at"].date(), event.get("division") or "", event["event"])
+            for event in events
+        )
+        for (day, division, event), count in counts.items():
+            await self._increment(
+                QuestionEventRollup,
+                {"day": day, "division": division, "event": event},
+                {"count": count},
+            )
+
+        for (day, division, duty), increments in _sla_increments(
+            events, questions, responded
+        ).items():
+            await self._increment(
+                QuestionSlaDaily,
+                {"day": day, "division": division, "duty": duty},
+                increments,
+            )
+
+        await self.session.commit()
+
+    async def get_event_counts(
+        self, start: date, end: date, division: Optional[str] = None
+    ) -> dict[str, int]:
+        """
+        Кол-во событий вопросов за период по агрегатам, без обращения к таблице вопросов
+        :param start: Первый день периода
+        :param end: Последний день периода (включительно)
+        :param division: Направление (None или ВСЕ — все направления)
+        :return: Словарь тип события -> кол-во
+        """
+        stmt = (
+            select(QuestionEventRollup.event, func.sum(QuestionEventRollup.count))
+            .where(QuestionEventRollup.day.between(start, end))
+            .group_by(QuestionEventRollup.event)
+        )
+        if division and division != "ВСЕ":
+            stmt = stmt.where(QuestionEventRollup.division.ilike(f"%{division}%"))
+
+        result = await self.session.execute(stmt)
+        return {event: int(count) for event, count in result.all()}
+
+    async def get_sla_stats(
+        self, start: date, end: date, division: Optional[str] = None
+    ) -> list[DutySla]:
+        """
+        Метрики SLA дежурных за период по дневным агрегатам: O(дней × дежурных),
+        без обращения к таблицам вопросов и сообщений
+        :param start: Первый день периода
+        :param end: Последний день периода (включительно)
+        :param division: Направление (None или ВСЕ — все направления)
+        :return: Метрики по дежурным, отсортированные по кол-ву закрытых вопросов
+        """
+        columns = [
+            QuestionSlaDaily.responded_count,
+            QuestionSlaDaily.first_response_seconds,
+            QuestionSlaDaily.closed_count,
+            QuestionSlaDaily.handle_seconds,
+            *(
+                getattr(QuestionSlaDaily, f"first_response_bucket_{i}")
+                for i in range(len(SLA_BUCKETS) + 1)
+            ),
+            *(
+                getattr(QuestionSlaDaily, f"handle_bucket_{i}")
+                for i in range(len(SLA_BUCKETS) + 1)
+            ),
+        ]
+        stmt = (
+            select(QuestionSlaDaily.duty, *(func.sum(column) for column in columns))
+            .where(QuestionSlaDaily.day.between(start, end))
+            .group_by(QuestionSlaDaily.duty)
+        )
+        if division and division != "ВСЕ":
+            stmt = stmt.where(QuestionSlaDaily.division.ilike(f"%{division}%"))
+
+        result = await self.session.execute(stmt)
+        buckets_count = len(SLA_BUCKETS) + 1
+        stats = []
+        for duty, *values in result.all():
+            values = [int(value or 0) for value in values]
+            responded, first_response_seconds, closed, handle_seconds = values[:4]
+            first_response_buckets = values[4 : 4 + buckets_count]
+            handle_buckets = values[4 + buckets_count :]
+            stats.append(
+                DutySla(
+                    duty=duty,
+                    responded=responded,
+                    closed=closed,
+                    avg_first_response=first_response_seconds / responded
+                    if responded
+                    else None,
+                    avg_handle=handle_seconds / closed if closed else None,
+                    first_response_p50=_bucket_percentile(first_response_buckets, 0.5),
+                    first_response_p90=_bucket_percentile(first_response_buckets, 0.9),
+                    handle_p50=_bucket_percentile(handle_buckets, 0.5),
+                    handle_p90=_bucket_percentile(handle_buckets, 0.9),
+                )
+            )
+        return sorted(stats, key=lambda duty_sla: duty_sla.closed, reverse=True)
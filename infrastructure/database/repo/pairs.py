@@ -1,9 +1,11 @@
+from datetime import datetime
 from typing import Optional, Sequence
 
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from infrastructure.database.models import MessagesPair
+from tgbot.services.events import event_writer
 
 
 class MessagesPairsRepo:
@@ -51,8 +53,38 @@ class MessagesPairsRepo:
         await self.session.commit()
         await self.session.flush()
         await self.session.refresh(connection)
+        event_writer.emit(
+            question_token, "message", value=direction, occurred_at=connection.created_at
+        )
         return connection
 
+    async def add_pairs(self, pairs: Sequence[dict]) -> list[MessagesPair]:
+        """
+        Add several message connections in one transaction
+
+        Args:
+            pairs: Sequence of dicts with the same keys as add_pair arguments
+
+        Returns:
+            Created MessagesPair instances
+        """
+        # Одно время на пачку: оно же записывается в события, как в add_pair
+        created_at = datetime.now()
+        connections = [MessagesPair(**pair, created_at=created_at) for pair in pairs]
+        if not connections:
+            return []
+
+        self.session.add_all(connections)
+        await self.session.commit()
+        for connection in connections:
+            event_writer.emit(
+                connection.question_token,
+                "message",
+                value=connection.direction,
+                occurred_at=created_at,
+            )
+        return connections
+
     async def find_by_user_message(
         self, user_chat_id: int, user_message_id: int
     ) -> Optional[MessagesPair]:
@@ -1,20 +1,46 @@
 import logging
 import uuid
 from datetime import date, datetime, timedelta
-from typing import Optional, Sequence
+from typing import Literal, Optional, Sequence
 
-from sqlalchemy import and_, extract, func, or_, select
+from sqlalchemy import DateTime, and_, extract, func, or_, select, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 
 from infrastructure.database.models import Question, User
 from infrastructure.database.repo.base import BaseRepo
-from tgbot.config import load_config
-from tgbot.services.logger import setup_logging
+from tgbot.config import get_config
+from tgbot.services.cache import active_question_key, cache
+from tgbot.services.events import event_writer
 
-config = load_config(".env")
-
-setup_logging()
 logger = logging.getLogger(__name__)
 
+# Кол-во вопросов на одной странице списка доступных к возврату
+RETURN_PAGE_SIZE = 5
+# Кол-во вопросов, обрабатываемых за один проход поиска бездействующих вопросов
+INACTIVE_BATCH_SIZE = 50
+
+
+class _as_datetime(FunctionElement):
+    """
+    Приводит параметр к типу колонки DATETIME. pyodbc передает время как DATETIME2, и SQL Server
+    сравнивает его с колонкой DATETIME (шаг 3,33 мс) после преобразования колонки, поэтому
+    значение, прочитанное из строки, не равно самой строке
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(_as_datetime)
+def _compile_as_datetime(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(_as_datetime, "mssql")
+def _compile_as_datetime_mssql(element, compiler, **kw):
+    return "CAST(%s AS DATETIME)" % compiler.process(element.clauses, **kw)
+
 
 class QuestionsRepo(BaseRepo):
     async def add_question(
@@ -62,6 +88,14 @@ class QuestionsRepo(BaseRepo):
         self.session.add(question)
         await self.session.commit()
         await self.session.refresh(question)
+        await cache.invalidate(active_question_key(employee_chat_id))
+        event_writer.emit(
+            token,
+            "opened",
+            actor=employee_fullname,
+            division=employee_division,
+            occurred_at=start_time,
+        )
         return question
 
     async def get_question(
@@ -93,6 +127,34 @@ class QuestionsRepo(BaseRepo):
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_active_question_token(self, employee_chat_id: int) -> Optional[str]:
+        """
+        Получение токена активного вопроса специалиста.
+        Результат кешируется в общем кеше и сбрасывается при смене статуса вопроса
+        :param employee_chat_id: Идентификатор специалиста Telegram
+        :return: Токен активного вопроса или None
+        """
+        key = active_question_key(employee_chat_id)
+        cached = await cache.get(key)
+        if cached is not None:
+            return cached or None
+
+        version = await cache.version(key)
+        stmt = (
+            select(Question.token)
+            .where(
+                Question.employee_chat_id == employee_chat_id,
+                or_(Question.status == "open", Question.status == "in_progress"),
+            )
+            .limit(1)
+        )
+        result = await self.session.execute(stmt)
+        token = result.scalar_one_or_none()
+
+        # Отсутствие вопроса кешируем пустой строкой, чтобы не ходить в БД на каждое сообщение
+        await cache.set(key, token or "", version=version)
+        return token
+
     async def update_question_status(
         self, token: str, status: str
     ) -> Optional[Question]:
@@ -104,11 +166,74 @@ class QuestionsRepo(BaseRepo):
         """
         question = await self.session.get(Question, token)
         if question:
+            previous_status = question.status
             question.status = status
+            if status not in ("open", "in_progress"):
+                # Закрытый вопрос больше не отслеживается на бездействие
+                question.last_activity_at = None
             await self.session.commit()
             await self.session.refresh(question)
+            await cache.invalidate(active_question_key(question.employee_chat_id))
+            if status == "closed" and previous_status != "closed":
+                event_writer.emit(
+                    token, "closed", division=question.employee_division, value=status
+                )
+            elif status in ("open", "in_progress") and previous_status == "closed":
+                event_writer.emit(
+                    token,
+                    "returned",
+                    actor=question.employee_fullname,
+                    division=question.employee_division,
+                )
         return question
 
+    async def close_question(self, token: str, end_time: datetime) -> Optional[Question]:
+        """
+        Закрытие активного вопроса одним UPDATE: статус и время закрытия меняются вместе
+        и только если вопрос еще открыт, поэтому параллельное закрытие сработает один раз
+        :param token: Уникальный идентификатор вопроса
+        :param end_time: Время закрытия вопроса
+        :return: Закрытый вопрос (только поля для уведомлений) или None, если вопрос уже не активен
+        """
+        stmt = (
+            update(Question)
+            .where(
+                Question.token == token,
+                or_(Question.status == "open", Question.status == "in_progress"),
+            )
+            .values(status="closed", end_time=end_time, last_activity_at=None)
+            .returning(
+                Question.token,
+                Question.group_id,
+                Question.topic_id,
+                Question.employee_chat_id,
+                Question.employee_division,
+            )
+        )
+        result = await self.session.execute(stmt)
+        row = result.one_or_none()
+        await self.session.commit()
+        if row is None:
+            return None
+
+        await cache.invalidate(active_question_key(row.employee_chat_id))
+        event_writer.emit(
+            token,
+            "closed",
+            division=row.employee_division,
+            value="auto",
+            occurred_at=end_time,
+        )
+        return Question(
+            token=row.token,
+            group_id=row.group_id,
+            topic_id=row.topic_id,
+            employee_chat_id=row.employee_chat_id,
+            employee_division=row.employee_division,
+            status="closed",
+            end_time=end_time,
+        )
+
     async def update_question_end(
         self, token: str, end_time: date
     ) -> Optional[Question]:
@@ -143,6 +268,15 @@ class QuestionsRepo(BaseRepo):
                 question.quality_employee = quality
             await self.session.commit()
             await self.session.refresh(question)
+            event_writer.emit(
+                token,
+                "rated",
+                actor=(
+                    question.topic_duty_fullname if is_duty else question.employee_fullname
+                ),
+                division=question.employee_division,
+                value=f"{'duty' if is_duty else 'employee'}:{int(quality)}",
+            )
         return question
 
     async def update_question_duty(
@@ -156,9 +290,21 @@ class QuestionsRepo(BaseRepo):
         """
         question = await self.session.get(Question, token)
         if question:
+            previous_duty = question.topic_duty_fullname
             question.topic_duty_fullname = topic_duty
             await self.session.commit()
             await self.session.refresh(question)
+            if topic_duty:
+                event_writer.emit(
+                    token, "taken", actor=topic_duty, division=question.employee_division
+                )
+            elif previous_duty:
+                event_writer.emit(
+                    token,
+                    "released",
+                    actor=previous_duty,
+                    division=question.employee_division,
+                )
         return question
 
     async def update_question_return_status(
@@ -193,6 +339,93 @@ class QuestionsRepo(BaseRepo):
             await self.session.refresh(question)
         return question
 
+    async def touch_question_activity(
+        self, token: str, at: Optional[datetime] = None
+    ) -> None:
+        """
+        Отметка активности в открытом вопросе. Сбрасывает отметку о предупреждении
+        :param token: Уникальный идентификатор вопроса
+        :param at: Время активности (по умолчанию — текущее)
+        """
+        await self.session.execute(
+            update(Question)
+            .where(
+                Question.token == token,
+                or_(Question.status == "open", Question.status == "in_progress"),
+            )
+            .values(last_activity_at=at or datetime.now(), activity_warned_at=None)
+        )
+        await self.session.commit()
+
+    async def get_inactive_questions(
+        self,
+        before: datetime,
+        activity_status_default: bool,
+        only_unwarned: bool = False,
+        cursor: Optional[tuple[datetime, str]] = None,
+        limit: int = INACTIVE_BATCH_SIZE,
+    ) -> Sequence[Question]:
+        """
+        Получение пачки открытых вопросов без активности с момента before.
+        Пачки перебираются по ключу (last_activity_at, token) по индексу ix_questions_last_activity
+        :param before: Время, до которого должна быть последняя активность
+        :param activity_status_default: Отслеживать ли бездействие вопросов без персональной настройки
+        :param only_unwarned: Только вопросы, по которым еще не было предупреждения
+        :param cursor: (last_activity_at, token) последнего вопроса предыдущей пачки — значения
+            из возвращенной строки, а не вычисленные в Python
+        :param limit: Размер пачки
+        :return: Последовательность вопросов
+        """
+        stmt = select(Question).where(Question.last_activity_at < before)
+        if activity_status_default:
+            stmt = stmt.where(
+                or_(
+                    Question.activity_status_enabled.is_(None),
+                    Question.activity_status_enabled.is_(True),
+                )
+            )
+        else:
+            stmt = stmt.where(Question.activity_status_enabled.is_(True))
+        if only_unwarned:
+            stmt = stmt.where(Question.activity_warned_at.is_(None))
+        if cursor:
+            last_activity_at, token = cursor
+            stmt = stmt.where(
+                or_(
+                    Question.last_activity_at > last_activity_at,
+                    and_(
+                        Question.last_activity_at == last_activity_at,
+                        Question.token > token,
+                    ),
+                )
+            )
+
+        stmt = (
+            stmt.order_by(Question.last_activity_at, Question.token)
+            .limit(limit)
+            # Вопросы, уже загруженные в сессию, получают сохраненное в БД время активности
+            .execution_options(populate_existing=True)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def mark_questions_warned(
+        self, tokens: Sequence[str], at: Optional[datetime] = None
+    ) -> None:
+        """
+        Отметка о предупреждении о бездействии для пачки вопросов одним запросом
+        :param tokens: Уникальные идентификаторы вопросов
+        :param at: Время предупреждения (по умолчанию — текущее)
+        """
+        if not tokens:
+            return
+        await self.session.execute(
+            update(Question)
+            .where(Question.token.in_(tokens))
+            .values(activity_warned_at=at or datetime.now())
+        )
+        await self.session.commit()
+
     async def get_questions_by_month(
         self, month: int, year: int, division: str = None
     ) -> Sequence[Question]:
@@ -351,6 +584,75 @@ class QuestionsRepo(BaseRepo):
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_returnable_questions_page(
+        self,
+        employee_chat_id: Optional[int] = None,
+        cursor: Optional[tuple[datetime, str]] = None,
+        direction: Literal["next", "prev"] = "next",
+        limit: int = RETURN_PAGE_SIZE,
+    ) -> tuple[list[Question], bool, bool]:
+        """
+        Получение страницы доступных к возврату вопросов за последние 24 часа.
+        Пагинация по ключу (end_time, token): стоимость запроса не зависит от номера страницы
+        :param employee_chat_id: Идентификатор специалиста Telegram (None — вопросы всех специалистов)
+        :param cursor: (end_time, token) крайнего вопроса текущей страницы. None — первая страница
+        :param direction: next — более старые вопросы после курсора, prev — более новые до курсора
+        :param limit: Размер страницы
+        :return: Вопросы страницы (новые сверху), есть ли более новые вопросы, есть ли более старые
+        """
+        twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
+
+        conditions = [
+            Question.allow_return,
+            Question.end_time.is_not(None),
+            Question.end_time >= twenty_four_hours_ago,
+            Question.status == "closed",
+            Question.question_text.is_not(None),
+        ]
+        if employee_chat_id is not None:
+            conditions.append(Question.employee_chat_id == employee_chat_id)
+
+        if cursor is not None:
+            end_time, token = cursor
+            end_time = _as_datetime(end_time)
+            if direction == "next":
+                conditions.append(
+                    or_(
+                        Question.end_time < end_time,
+                        and_(Question.end_time == end_time, Question.token < token),
+                    )
+                )
+            else:
+                conditions.append(
+                    or_(
+                        Question.end_time > end_time,
+                        and_(Question.end_time == end_time, Question.token > token),
+                    )
+                )
+
+        if direction == "next":
+            order_by = (Question.end_time.desc(), Question.token.desc())
+        else:
+            order_by = (Question.end_time.asc(), Question.token.asc())
+
+        # Лишняя строка показывает, есть ли следующая страница, без отдельного COUNT
+        stmt = (
+            select(Question)
+            .where(and_(*conditions))
+            .order_by(*order_by)
+            .limit(limit + 1)
+        )
+        result = await self.session.execute(stmt)
+        questions = list(result.scalars().all())
+
+        has_more = len(questions) > limit
+        questions = questions[:limit]
+
+        if direction == "prev":
+            questions.reverse()
+            return questions, has_more, True
+        return questions, cursor is not None, has_more
+
     async def get_top_users_by_division(
         self, division: str, main_repo, limit: int = 15
     ) -> Sequence[User]:
@@ -400,13 +702,17 @@ class QuestionsRepo(BaseRepo):
         # Возвращаем только объекты User
         return [user_data["user"] for user_data in sorted_users]
 
-    async def get_old_questions(self) -> Sequence[Question]:
+    async def get_old_questions(self, days: int = None) -> Sequence[Question]:
         """
         Получение вопросов старше выставленной в конфиге даты
+        :param days: Возраст вопроса в днях. По умолчанию берется из конфига
         :return: Последовательность вопросов старше определенной даты
         """
+        if days is None:
+            days = get_config().tg_bot.remove_old_questions_days
+
         today = datetime.now()
-        old_date = today - timedelta(days=config.tg_bot.remove_old_questions_days)
+        old_date = today - timedelta(days=days)
 
         stmt = select(Question).where(Question.start_time < old_date)
         result = await self.session.execute(stmt)
@@ -445,8 +751,10 @@ class QuestionsRepo(BaseRepo):
                 await self.session.delete(question)
                 deleted_count = 1
                 total_count = 1
+                employee_chat_ids = {question.employee_chat_id}
             else:
                 total_count = len(questions)
+                employee_chat_ids = {question.employee_chat_id for question in questions}
                 for question in questions:
                     try:
                         await self.session.refresh(question)
@@ -458,6 +766,9 @@ class QuestionsRepo(BaseRepo):
                         )
 
             await self.session.commit()
+            await cache.invalidate(
+                *(active_question_key(chat_id) for chat_id in employee_chat_ids)
+            )
 
             return {
                 "success": deleted_count > 0,
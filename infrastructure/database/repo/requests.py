@@ -2,6 +2,7 @@ from dataclasses import dataclass
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infrastructure.database.repo.events import QuestionEventsRepo
 from infrastructure.database.repo.pairs import MessagesPairsRepo
 from infrastructure.database.repo.questions import QuestionsRepo
 from infrastructure.database.repo.users import UserRepo
@@ -37,3 +38,10 @@ class RequestsRepo:
         The MessageConnectionRepo repository sessions are required to manage message connections.
         """
         return MessagesPairsRepo(self.session)
+
+    @property
+    def events(self) -> QuestionEventsRepo:
+        """
+        The QuestionEventsRepo repository sessions are required to manage question lifecycle events.
+        """
+        return QuestionEventsRepo(self.session)
@@ -1,16 +1,34 @@
 import logging
-from typing import Optional, Sequence
+from typing import Iterable, Optional, Sequence
 
 from sqlalchemy import and_, select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 
 from infrastructure.database.models.user import User
 from infrastructure.database.repo.base import BaseRepo
-from tgbot.services.logger import setup_logging
+from tgbot.services.cache import cache, user_key
+from tgbot.services.permissions import Capability, roles_with
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
+# Поля пользователя, которые хранятся в общем кеше
+USER_CACHE_FIELDS = (
+    "id",
+    "ChatId",
+    "Username",
+    "Division",
+    "Position",
+    "FIO",
+    "Boss",
+    "Email",
+    "Role",
+)
+# Ключ кеша списка администраторов
+ADMINS_CACHE_KEY = "users:admins"
+ADMINS_CACHE_TTL = 60
+# SQL Server принимает не больше 2100 параметров в запросе
+CHAT_IDS_CHUNK_SIZE = 2000
+
 
 class UserRepo(BaseRepo):
     async def get_user(
@@ -52,8 +70,12 @@ class UserRepo(BaseRepo):
         try:
             result = await self.session.execute(query)
             return result.scalar_one_or_none()
+        except DBAPIError:
+            # Ошибки соединения пробрасываем: иначе при недоступной БД пользователь
+            # выглядел бы как не найденный и получал бы бан
+            raise
         except SQLAlchemyError as e:
-            logger.error(f"[БД] Ошибка получения пользователя: {e}")
+            logger.error("[БД] Ошибка получения пользователя: %s", e)
             return None
 
     async def get_users_by_fio_parts(
@@ -86,19 +108,77 @@ class UserRepo(BaseRepo):
             result = await self.session.execute(query)
             return result.scalars().all()
         except SQLAlchemyError as e:
-            logger.error(f"[БД] Ошибка получения пользователей по ФИО: {e}")
+            logger.error("[БД] Ошибка получения пользователей по ФИО: %s", e)
+            return []
+
+    async def get_users_by_chat_ids(self, chat_ids: Iterable[int]) -> list[User]:
+        """
+        Поиск пользователей по списку идентификаторов Telegram одним запросом
+        (пачками, чтобы не упереться в лимит параметров SQL Server)
+
+        Args:
+            chat_ids: Идентификаторы пользователей Telegram
+
+        Returns:
+            Список найденных объектов User
+        """
+        chat_ids = list(chat_ids)
+        users = []
+        for start in range(0, len(chat_ids), CHAT_IDS_CHUNK_SIZE):
+            chunk = chat_ids[start : start + CHAT_IDS_CHUNK_SIZE]
+            result = await self.session.execute(
+                select(User).where(User.ChatId.in_(chunk))
+            )
+            users.extend(result.scalars().all())
+        return users
+
+    async def get_usernames_with_divisions(self) -> list[tuple[str, str]]:
+        """
+        Получение никнеймов и направлений всех пользователей с никнеймом
+        для построения таблицы маршрутизации вопросов
+
+        Returns:
+            Список пар (Username, Division)
+        """
+        query = select(User.Username, User.Division).where(User.Username.is_not(None))
+
+        try:
+            result = await self.session.execute(query)
+            return [(username, division) for username, division in result.all()]
+        except SQLAlchemyError as e:
+            logger.error("[БД] Ошибка получения направлений пользователей: %s", e)
             return []
 
     async def get_admins(self) -> Sequence[User]:
-        query = select(User).where(User.Role == 10)
+        """
+        Получение администраторов бота. Список кешируется и сбрасывается при смене любой роли
+        :return: Список объектов User
+        """
+        cached = await cache.get(ADMINS_CACHE_KEY)
+        if cached is not None:
+            return [User(**admin) for admin in cached]
+
+        version = await cache.version(ADMINS_CACHE_KEY)
+        query = select(User).where(User.Role.in_(roles_with(Capability.ADMIN)))
 
         try:
             result = await self.session.execute(query)
-            return result.scalars().all()
+            admins = result.scalars().all()
         except SQLAlchemyError as e:
-            logger.error(f"[БД] Ошибка получения администраторов: {e}")
+            logger.error("[БД] Ошибка получения администраторов: %s", e)
             return []
 
+        await cache.set(
+            ADMINS_CACHE_KEY,
+            [
+                {field: getattr(admin, field) for field in USER_CACHE_FIELDS}
+                for admin in admins
+            ],
+            ttl=ADMINS_CACHE_TTL,
+            version=version,
+        )
+        return admins
+
     async def update_user_role(self, user_id: str | int, role: int) -> Optional[User]:
         """
         Обновление роли пользователя
@@ -111,4 +191,5 @@ class UserRepo(BaseRepo):
             user.Role = role
             await self.session.commit()
             await self.session.refresh(user)
+            await cache.invalidate(user_key(user.ChatId), ADMINS_CACHE_KEY)
         return user
@@ -6,7 +6,7 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from infrastructure.database.models import Base
-from tgbot.config import load_config
+from tgbot.config import get_config
 
 from alembic import context
 
@@ -23,7 +23,7 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 # Load database config
-db_config = load_config(".env").db
+db_config = get_config(".env").db
 
 # Store the URL for later use - don't set it in config to avoid interpolation issues
 database_url = db_config.construct_sqlalchemy_url()
@@ -0,0 +1,39 @@
+"""Add filtered indexes for returnable questions pagination
+
+Revision ID: 003_returnable_questions_index
+Revises: 002_create_messages_pairs
+Create Date: 2025-01-XX XX:XX:XX.XXXXXX
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "003_returnable_questions_index"
+down_revision: Union[str, None] = "002_create_messages_pairs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Индексы покрывают только вопросы, которые можно вернуть, поэтому остаются маленькими
+    op.create_index(
+        "ix_questions_returnable",
+        "questions",
+        ["end_time", "token"],
+        mssql_where=sa.text("allow_return = 1 AND end_time IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_questions_returnable_employee",
+        "questions",
+        ["employee_chat_id", "end_time", "token"],
+        mssql_where=sa.text("allow_return = 1 AND end_time IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_questions_returnable_employee", table_name="questions")
+    op.drop_index("ix_questions_returnable", table_name="questions")
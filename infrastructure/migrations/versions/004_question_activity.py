@@ -0,0 +1,43 @@
+"""Add last activity tracking columns to questions
+
+Revision ID: 004_question_activity
+Revises: 003_returnable_questions_index
+Create Date: 2025-01-XX XX:XX:XX.XXXXXX
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import mssql
+
+# revision identifiers, used by Alembic.
+revision: str = "004_question_activity"
+down_revision: Union[str, None] = "003_returnable_questions_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # DATETIME2: ключ пачек поиска бездействия сравнивается с параметром DATETIME2 точно,
+    # DATETIME с шагом 3,33 мс при таком сравнении не равен самому себе
+    op.add_column(
+        "questions", sa.Column("last_activity_at", mssql.DATETIME2(), nullable=True)
+    )
+    op.add_column(
+        "questions", sa.Column("activity_warned_at", sa.DateTime(), nullable=True)
+    )
+    # В индекс попадают только открытые отслеживаемые вопросы
+    op.create_index(
+        "ix_questions_last_activity",
+        "questions",
+        ["last_activity_at", "token"],
+        mssql_where=sa.text("last_activity_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_questions_last_activity", table_name="questions")
+    op.drop_column("questions", "activity_warned_at")
+    op.drop_column("questions", "last_activity_at")
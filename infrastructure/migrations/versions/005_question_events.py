@@ -0,0 +1,56 @@
+"""Create question_events and question_event_rollups tables
+
+Revision ID: 005_question_events
+Revises: 004_question_activity
+Create Date: 2025-01-XX XX:XX:XX.XXXXXX
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005_question_events"
+down_revision: Union[str, None] = "004_question_activity"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "question_events",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("question_token", sa.String(length=255), nullable=False),
+        sa.Column("event", sa.String(length=20), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.Column("actor", sa.Unicode(length=255), nullable=True),
+        sa.Column("division", sa.Unicode(length=50), nullable=True),
+        sa.Column("value", sa.Unicode(length=50), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_question_events_token",
+        "question_events",
+        ["question_token", "occurred_at"],
+    )
+    op.create_index(
+        "ix_question_events_occurred_at", "question_events", ["occurred_at"]
+    )
+
+    op.create_table(
+        "question_event_rollups",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("division", sa.Unicode(length=50), nullable=False),
+        sa.Column("event", sa.String(length=20), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "division", "event"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("question_event_rollups")
+    op.drop_index("ix_question_events_occurred_at", table_name="question_events")
+    op.drop_index("ix_question_events_token", table_name="question_events")
+    op.drop_table("question_events")
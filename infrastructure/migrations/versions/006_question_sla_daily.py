@@ -0,0 +1,47 @@
+"""Create question_sla_daily table
+
+Revision ID: 006_question_sla_daily
+Revises: 005_question_events
+Create Date: 2025-01-XX XX:XX:XX.XXXXXX
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "006_question_sla_daily"
+down_revision: Union[str, None] = "005_question_events"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Кол-во корзин гистограмм: границы SLA_BUCKETS и корзина сверх последней границы
+BUCKETS_COUNT = 6
+
+
+def upgrade() -> None:
+    op.create_table(
+        "question_sla_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("division", sa.Unicode(length=50), nullable=False),
+        sa.Column("duty", sa.Unicode(length=255), nullable=False),
+        sa.Column("responded_count", sa.Integer(), nullable=False),
+        sa.Column("first_response_seconds", sa.BigInteger(), nullable=False),
+        sa.Column("closed_count", sa.Integer(), nullable=False),
+        sa.Column("handle_seconds", sa.BigInteger(), nullable=False),
+        *(
+            sa.Column(f"first_response_bucket_{i}", sa.Integer(), nullable=False)
+            for i in range(BUCKETS_COUNT)
+        ),
+        *(
+            sa.Column(f"handle_bucket_{i}", sa.Integer(), nullable=False)
+            for i in range(BUCKETS_COUNT)
+        ),
+        sa.PrimaryKeyConstraint("day", "division", "duty"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("question_sla_daily")
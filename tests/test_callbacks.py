@@ -0,0 +1,53 @@
+import itertools
+
+import pytest
+
+from tgbot.services.callbacks import _decoders, decode_callback
+
+# Значения, которые pack() не порождает, но которые могут прийти в callback_data
+SAMPLE_VALUES = ("", "0", "1", "-5", "007", "true", "no", "abc", " 1", "1_000", "next", "prev")
+
+
+def _unpack(callback_cls, data):
+    try:
+        return callback_cls.unpack(data)
+    except (TypeError, ValueError):
+        return None
+
+
+@pytest.mark.parametrize("prefix", sorted(_decoders))
+def test_decode_matches_unpack(prefix):
+    decoder = _decoders[prefix]
+    callback_cls = decoder.callback_cls
+
+    for values in itertools.product(SAMPLE_VALUES, repeat=len(decoder.fields)):
+        data = decoder.separator.join((prefix, *values))
+        expected = _unpack(callback_cls, data)
+        decoded = decode_callback(data)
+
+        if expected is None:
+            assert decoded is None, data
+        else:
+            assert type(decoded) is callback_cls, data
+            assert decoded.model_dump() == expected.model_dump(), data
+
+
+@pytest.mark.parametrize("prefix", sorted(_decoders))
+def test_decode_rejects_wrong_arity(prefix):
+    decoder = _decoders[prefix]
+    data = decoder.separator.join((prefix, *["1"] * (len(decoder.fields) + 1)))
+
+    assert decode_callback(data) is None
+    assert _unpack(decoder.callback_cls, data) is None
+
+
+def test_decoded_objects_are_not_shared():
+    data = "q_quality_duty:1:abc:0"
+    decoded = decode_callback(data)
+    decoded.token = "changed"
+    decoded.answer = False
+
+    again = decode_callback(data)
+    assert again is not decoded
+    assert again.token == "abc"
+    assert again.answer is True
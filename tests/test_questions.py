@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import mssql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from infrastructure.database.models import Question
+from infrastructure.database.repo.questions import QuestionsRepo, _as_datetime
+
+aiosqlite = pytest.importorskip("aiosqlite")
+
+
+def test_cursor_cast_to_column_type_on_mssql():
+    sql = str(
+        (Question.end_time == _as_datetime(datetime(2025, 3, 1))).compile(
+            dialect=mssql.dialect()
+        )
+    )
+    assert "CAST(" in sql and "AS DATETIME)" in sql
+
+
+async def _pages(direction_back: bool):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Question.__table__.create)
+    session_pool = async_sessionmaker(engine, expire_on_commit=False)
+
+    # Семь вопросов, закрытых в одну и ту же миллисекунду, и два раньше
+    end_time = datetime.now().replace(microsecond=3000) - timedelta(hours=1)
+    end_times = [end_time] * 7 + [end_time - timedelta(minutes=1)] * 2
+    async with session_pool() as session:
+        session.add_all(
+            Question(
+                token=f"q{i}",
+                group_id=-1,
+                topic_id=i,
+                employee_fullname="Иванов",
+                employee_chat_id=1,
+                employee_division="НЦК",
+                question_text="?",
+                end_time=question_end_time,
+                status="closed",
+                allow_return=True,
+            )
+            for i, question_end_time in enumerate(end_times)
+        )
+        await session.commit()
+
+    pages = []
+    async with session_pool() as session:
+        repo = QuestionsRepo(session)
+        questions, _, has_older = await repo.get_returnable_questions_page(limit=4)
+        pages.append([q.token for q in questions])
+        while has_older:
+            last = questions[-1]
+            questions, _, has_older = await repo.get_returnable_questions_page(
+                cursor=(last.end_time, last.token), direction="next", limit=4
+            )
+            pages.append([q.token for q in questions])
+
+        if direction_back:
+            pages = [pages[-1]]
+            has_newer = True
+            while has_newer:
+                first = questions[0]
+                questions, has_newer, _ = await repo.get_returnable_questions_page(
+                    cursor=(first.end_time, first.token), direction="prev", limit=4
+                )
+                pages.insert(0, [q.token for q in questions])
+
+    await engine.dispose()
+    return pages
+
+
+def test_pages_across_equal_end_time():
+    pages = asyncio.run(_pages(direction_back=False))
+    tokens = [token for page in pages for token in page]
+
+    assert tokens == ["q6", "q5", "q4", "q3", "q2", "q1", "q0", "q8", "q7"]
+
+
+def test_prev_does_not_repeat_boundary_row():
+    pages = asyncio.run(_pages(direction_back=True))
+    tokens = [token for page in pages for token in page]
+
+    assert tokens == ["q6", "q5", "q4", "q3", "q2", "q1", "q0", "q8", "q7"]
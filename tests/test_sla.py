@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from infrastructure.database.models.sla import SLA_BUCKETS
+from infrastructure.database.repo.events import _bucket_percentile, _sla_increments
+
+START = datetime(2025, 3, 1, 10, 0, 0)
+QUESTIONS = {
+    "q1": SimpleNamespace(start_time=START, topic_duty_fullname="Петров"),
+    "q2": SimpleNamespace(start_time=START, topic_duty_fullname=None),
+}
+
+
+def _event(token, event, seconds, value=None, division="НЦК"):
+    return {
+        "question_token": token,
+        "event": event,
+        "occurred_at": START + timedelta(seconds=seconds),
+        "division": division,
+        "value": value,
+    }
+
+
+def _response(token, seconds):
+    return _event(token, "message", seconds, value="topic_to_user")
+
+
+@pytest.mark.parametrize(
+    "seconds, bucket",
+    [
+        (0, 0),
+        (SLA_BUCKETS[0], 0),
+        (SLA_BUCKETS[0] + 1, 1),
+        (SLA_BUCKETS[-1], len(SLA_BUCKETS) - 1),
+        (SLA_BUCKETS[-1] + 1, len(SLA_BUCKETS)),
+    ],
+)
+def test_bucket_boundaries(seconds, bucket):
+    increments = _sla_increments([_response("q1", seconds)], QUESTIONS, set())
+
+    (counter,) = increments.values()
+    assert counter["responded_count"] == 1
+    assert counter["first_response_seconds"] == seconds
+    assert counter[f"first_response_bucket_{bucket}"] == 1
+
+
+def test_first_response_counted_once_across_batches():
+    responded = set()
+
+    first = _sla_increments(
+        [_response("q1", 30), _response("q1", 90)], QUESTIONS, responded
+    )
+    second = _sla_increments([_response("q1", 120)], QUESTIONS, responded)
+
+    (counter,) = first.values()
+    assert counter["responded_count"] == 1
+    assert counter["first_response_seconds"] == 30
+    assert not second
+    assert responded == {"q1"}
+
+
+def test_handle_time_and_keys():
+    increments = _sla_increments(
+        [
+            _event("q1", "closed", 600),
+            _event("q2", "closed", 7200, division=None),
+            _event("q1", "message", 10, value="user_to_topic"),
+            _event("unknown", "closed", 10),
+        ],
+        QUESTIONS,
+        set(),
+    )
+
+    day = START.date()
+    assert set(increments) == {(day, "НЦК", "Петров"), (day, "", "")}
+    assert increments[(day, "НЦК", "Петров")]["handle_seconds"] == 600
+    assert increments[(day, "НЦК", "Петров")]["handle_bucket_2"] == 1
+    assert increments[(day, "", "")][f"handle_bucket_{len(SLA_BUCKETS)}"] == 1
+
+
+def test_bucket_percentile():
+    # 5 ответов до минуты, 4 — до 5 минут, 1 — до 15 минут
+    buckets = [5, 4, 1, 0, 0, 0]
+
+    assert _bucket_percentile(buckets, 0.5) == SLA_BUCKETS[0]
+    assert _bucket_percentile(buckets, 0.9) == SLA_BUCKETS[1]
+    assert _bucket_percentile(buckets, 1.0) == SLA_BUCKETS[2]
+
+
+def test_bucket_percentile_overflow_and_empty():
+    assert _bucket_percentile([1, 0, 0, 0, 0, 9], 0.5) is None
+    assert _bucket_percentile([0] * (len(SLA_BUCKETS) + 1), 0.5) is None
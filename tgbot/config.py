@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import logging
+from dataclasses import dataclass, field
 from typing import Optional
 
 from environs import Env
@@ -18,6 +19,34 @@ class TgBot:
         Нужно ли использовать Redis.
     division : str
         Направление, для которого запускается текущий экземпляр бота.
+    log_json : bool
+        Выводить логи в формате JSON.
+    bot_name : Optional[str]
+        Имя бота, устанавливаемое при запуске (не задано — не меняется).
+    bot_description : Optional[str]
+        Описание бота, устанавливаемое при запуске (не задано — не меняется).
+    shutdown_timeout : int
+        Максимальное время корректной остановки бота в секундах.
+    updates_concurrency : int
+        Максимальное кол-во апдейтов, обрабатываемых одновременно (по всем чатам).
+    membership_reconcile_minutes : int
+        Период сверки участников форумов с БД в минутах (0 — сверка отключена).
+    division_forums : dict[str, str]
+        Форумы по направлениям. По умолчанию НЦК и НТП, дополняются из DIVISION_FORUMS.
+    intern_forums : dict[str, str]
+        Форумы для стажеров по направлениям. По умолчанию НЦК ОР, дополняются из INTERN_FORUMS.
+    routing_refresh_minutes : int
+        Период обновления таблицы маршрутизации вопросов по форумам в минутах.
+    topic_pool : bool
+        Создавать топики для вопросов заранее.
+    topic_pool_min : int
+        Минимальное кол-во свободных топиков в каждом форуме.
+    topic_pool_max : int
+        Максимальное кол-во свободных топиков в каждом форуме.
+    activity_engine : str
+        Способ отслеживания бездействия: jobs — таймеры на каждый вопрос, sweep — периодический поиск по БД.
+    activity_sweep_seconds : int
+        Период поиска бездействующих вопросов в секундах (для activity_engine=sweep).
     """
 
     token: str
@@ -38,6 +67,21 @@ class TgBot:
     activity_warn_minutes: int
     activity_close_minutes: int
 
+    log_json: bool = False
+    bot_name: Optional[str] = None
+    bot_description: Optional[str] = None
+    shutdown_timeout: int = 25
+    updates_concurrency: int = 100
+    membership_reconcile_minutes: int = 30
+    division_forums: dict[str, str] = field(default_factory=dict)
+    intern_forums: dict[str, str] = field(default_factory=dict)
+    routing_refresh_minutes: int = 15
+    topic_pool: bool = False
+    topic_pool_min: int = 2
+    topic_pool_max: int = 20
+    activity_engine: str = "jobs"
+    activity_sweep_seconds: int = 30
+
     @staticmethod
     def from_env(env: Env):
         """
@@ -61,6 +105,28 @@ class TgBot:
         activity_status = env.bool("ACTIVITY_STATUS")
         activity_warn_minutes = env.int("ACTIVITY_WARN_MINUTES")
         activity_close_minutes = env.int("ACTIVITY_CLOSE_MINUTES")
+        activity_engine = env.str("ACTIVITY_ENGINE", "jobs")
+        activity_sweep_seconds = env.int("ACTIVITY_SWEEP_SECONDS", 30)
+
+        log_json = env.bool("LOG_JSON", False)
+
+        bot_name = env.str("BOT_NAME", None) or None
+        bot_description = env.str("BOT_DESCRIPTION", None) or None
+
+        shutdown_timeout = env.int("SHUTDOWN_TIMEOUT", 25)
+        updates_concurrency = env.int("UPDATES_CONCURRENCY", 100)
+        membership_reconcile_minutes = env.int("MEMBERSHIP_RECONCILE_MINUTES", 30)
+
+        # Формат: НАПРАВЛЕНИЕ=ID_ФОРУМА,НАПРАВЛЕНИЕ=ID_ФОРУМА
+        division_forums = {"НЦК": nck_forum_id, "НТП": ntp_forum_id}
+        division_forums.update(env.dict("DIVISION_FORUMS", {}))
+        intern_forums = {"НЦК": nck_or_forum_id}
+        intern_forums.update(env.dict("INTERN_FORUMS", {}))
+        routing_refresh_minutes = env.int("ROUTING_REFRESH_MINUTES", 15)
+
+        topic_pool = env.bool("TOPIC_POOL", False)
+        topic_pool_min = env.int("TOPIC_POOL_MIN", 2)
+        topic_pool_max = env.int("TOPIC_POOL_MAX", 20)
 
         return TgBot(
             token=token,
@@ -76,6 +142,20 @@ class TgBot:
             activity_status=activity_status,
             activity_warn_minutes=activity_warn_minutes,
             activity_close_minutes=activity_close_minutes,
+            log_json=log_json,
+            bot_name=bot_name,
+            bot_description=bot_description,
+            shutdown_timeout=shutdown_timeout,
+            updates_concurrency=updates_concurrency,
+            membership_reconcile_minutes=membership_reconcile_minutes,
+            division_forums=division_forums,
+            intern_forums=intern_forums,
+            routing_refresh_minutes=routing_refresh_minutes,
+            topic_pool=topic_pool,
+            topic_pool_min=topic_pool_min,
+            topic_pool_max=topic_pool_max,
+            activity_engine=activity_engine,
+            activity_sweep_seconds=activity_sweep_seconds,
         )
 
 
@@ -171,11 +251,17 @@ class RedisConfig:
         Порт, на котором слушает сервер Redis.
     redis_host : Optional(str)
         Хост, где запущен сервер Redis.
+    state_ttl : Optional(int)
+        Время жизни состояния FSM в секундах (None — бессрочно).
+    data_ttl : Optional(int)
+        Время жизни данных FSM в секундах (None — бессрочно).
     """
 
     redis_pass: Optional[str]
     redis_port: Optional[int]
     redis_host: Optional[str]
+    state_ttl: Optional[int] = None
+    data_ttl: Optional[int] = None
 
     def dsn(self) -> str:
         """
@@ -195,8 +281,16 @@ class RedisConfig:
         redis_port = env.int("REDIS_PORT")
         redis_host = env.str("REDIS_HOST")
 
+        # 0 отключает TTL
+        state_ttl = env.int("FSM_STATE_TTL", 24 * 60 * 60) or None
+        data_ttl = env.int("FSM_DATA_TTL", 24 * 60 * 60) or None
+
         return RedisConfig(
-            redis_pass=redis_pass, redis_port=redis_port, redis_host=redis_host
+            redis_pass=redis_pass,
+            redis_port=redis_port,
+            redis_host=redis_host,
+            state_ttl=state_ttl,
+            data_ttl=data_ttl,
         )
 
 
@@ -222,6 +316,23 @@ class Config:
     redis: Optional[RedisConfig] = None
 
 
+# Настройки, которые можно менять без перезапуска бота (SIGHUP).
+# Секреты и параметры подключений сюда не входят — они читаются только при старте
+RELOADABLE_TUNABLES = (
+    "ask_clever_link",
+    "remove_old_questions",
+    "remove_old_questions_days",
+    "activity_status",
+    "activity_warn_minutes",
+    "activity_close_minutes",
+)
+
+_config: Optional[Config] = None
+_config_path: Optional[str] = None
+
+logger = logging.getLogger(__name__)
+
+
 def load_config(path: str = None) -> Config:
     """
     Эта функция принимает в качестве входных данных опциональный путь к файлу и возвращает объект Config.
@@ -240,3 +351,46 @@ def load_config(path: str = None) -> Config:
         db=DbConfig.from_env(env),
         redis=RedisConfig.from_env(env),
     )
+
+
+def get_config(path: str = ".env") -> Config:
+    """
+    Возвращает общий для всего процесса объект Config.
+    Файл окружения читается только при первом вызове, дальше отдается закешированный объект.
+    :param path: Путь к файлу env, используется только при первой загрузке.
+    :return: Объект Config.
+    """
+    global _config, _config_path
+
+    if _config is None:
+        _config = load_config(path)
+        _config_path = path
+    return _config
+
+
+def reload_config() -> dict[str, tuple]:
+    """
+    Перечитывает файл окружения и обновляет несекретные настройки на месте.
+    Объект Config остается тем же, поэтому все, кто получил его через get_config или ConfigMiddleware,
+    сразу видят новые значения.
+    :return: Словарь измененных настроек вида {название: (старое значение, новое значение)}
+    """
+    config = get_config()
+
+    env = Env()
+    env.read_env(_config_path, override=True)
+    fresh = TgBot.from_env(env)
+
+    changes = {}
+    for name in RELOADABLE_TUNABLES:
+        old_value = getattr(config.tg_bot, name)
+        new_value = getattr(fresh, name)
+        if old_value != new_value:
+            setattr(config.tg_bot, name, new_value)
+            changes[name] = (old_value, new_value)
+
+    if changes:
+        logger.info("[Конфиг] Обновлены настройки: %s", changes)
+    else:
+        logger.info("[Конфиг] Настройки не изменились")
+    return changes
@@ -2,13 +2,9 @@ import logging
 
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
-from sqlalchemy import Sequence
 
-from infrastructure.database.models import Question
 from infrastructure.database.repo.requests import RequestsRepo
-from tgbot.services.logger import setup_logging
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -28,17 +24,14 @@ class ActiveQuestion(BaseFilter):
             return False
 
         logger.info(
-            f"Checking active question for user {obj.from_user.id} in private chat"
+            "Checking active question for user %s in private chat", obj.from_user.id
         )
 
-        active_questions: Sequence[
-            Question
-        ] = await questions_repo.questions.get_active_questions()
-
-        for question in active_questions:
-            if question.employee_chat_id == obj.from_user.id:
-                active_question_token = question.token
-                return {"active_question_token": active_question_token}
+        active_question_token = await questions_repo.questions.get_active_question_token(
+            employee_chat_id=obj.from_user.id
+        )
+        if active_question_token:
+            return {"active_question_token": active_question_token}
 
         return False
 
@@ -57,14 +50,13 @@ class ActiveQuestionWithCommand(BaseFilter):
             if not obj.text or not obj.text.startswith(f"/{self.command}"):
                 return False
 
-            current_questions: Sequence[
-                Question
-            ] = await questions_repo.questions.get_active_questions()
-
-            for question in current_questions:
-                if question.employee_chat_id == obj.from_user.id:
-                    active_question_token = question.token
-                    return {"active_question_token": active_question_token}
+            active_question_token = (
+                await questions_repo.questions.get_active_question_token(
+                    employee_chat_id=obj.from_user.id
+                )
+            )
+            if active_question_token:
+                return {"active_question_token": active_question_token}
 
             return False
         return None
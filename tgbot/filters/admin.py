@@ -2,14 +2,35 @@ from aiogram.filters import BaseFilter
 from aiogram.types import Message
 
 from infrastructure.database.models.user import User
-from tgbot.misc.dicts import executed_codes
+from tgbot.services.permissions import Capability, capabilities_for_role
 
 ADMIN_ROLE = 10
 
 
-class AdminFilter(BaseFilter):
-    async def __call__(self, obj: Message, user: User, **kwargs) -> bool:
-        if user is None:
-            return False
+class HasCapability(BaseFilter):
+    """
+    Проверяет права пользователя по маске, вычисленной DatabaseMiddleware из роли.
+    Не обращается к БД и не перебирает списки ролей.
+    """
 
-        return user.Role == executed_codes["root"]
+    def __init__(self, capability: Capability) -> None:
+        self.capability = capability
+
+    async def __call__(
+        self,
+        obj: Message,
+        user: User = None,
+        capabilities: Capability = None,
+        **kwargs,
+    ) -> bool:
+        if capabilities is None:
+            if user is None:
+                return False
+            capabilities = capabilities_for_role(user.Role)
+
+        return capabilities & self.capability == self.capability
+
+
+class AdminFilter(HasCapability):
+    def __init__(self) -> None:
+        super().__init__(Capability.ADMIN)
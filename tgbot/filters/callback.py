@@ -0,0 +1,42 @@
+from typing import Any, Optional
+
+from aiogram.filters import BaseFilter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+from magic_filter import MagicFilter
+
+from tgbot.services.callbacks import decode_callback
+
+
+class FastCallback(BaseFilter):
+    """
+    Замена CallbackData.filter() без повторного разбора строки в каждом роутере.
+
+    Строка разбирается один раз в CallbackDataMiddleware, фильтр лишь сравнивает префикс
+    и проверяет rule. Как и CallbackData.filter(), передает в хендлер callback_data.
+
+    Пример: FastCallback(ReturnQuestion, F.action == "show")
+    """
+
+    def __init__(
+        self, callback_data: type[CallbackData], rule: Optional[MagicFilter] = None
+    ) -> None:
+        self.prefix = callback_data.__prefix__
+        self.rule = rule
+
+    async def __call__(
+        self, query: CallbackQuery, parsed_callback: Any = None, **kwargs
+    ) -> bool | dict[str, Any]:
+        if parsed_callback is None:
+            # Мидлварь не подключена или строка не разобралась — пробуем разобрать здесь
+            if not query.data:
+                return False
+            parsed_callback = decode_callback(query.data)
+            if parsed_callback is None:
+                return False
+
+        if parsed_callback.__prefix__ != self.prefix:
+            return False
+        if self.rule is not None and not self.rule.resolve(parsed_callback):
+            return False
+        return {"callback_data": parsed_callback}
@@ -3,9 +3,6 @@ import logging
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
 
-from tgbot.services.logger import setup_logging
-
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -1,8 +1,9 @@
 """Import all routers and add them to routers_list."""
 
+from tgbot.handlers.group.members import group_members_router
 from tgbot.handlers.user.main import user_router
 
-routers_list = [user_router]
+routers_list = [group_members_router, user_router]
 
 __all__ = [
     "routers_list",
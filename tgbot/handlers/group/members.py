@@ -0,0 +1,16 @@
+import logging
+
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+
+from tgbot.services.membership import MembershipTracker
+
+group_members_router = Router()
+
+logger = logging.getLogger(__name__)
+
+
+@group_members_router.chat_member()
+async def track_member(event: ChatMemberUpdated, membership: MembershipTracker):
+    """Запоминает вход и выход участников форумов для фоновой сверки прав."""
+    membership.observe(event)
@@ -3,14 +3,9 @@ import logging
 from aiogram import Router
 from aiogram.types import Message
 
-from tgbot.config import load_config
-from tgbot.services.logger import setup_logging
 
 user_router = Router()
 
-config = load_config(".env")
-
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
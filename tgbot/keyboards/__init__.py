@@ -0,0 +1,3 @@
+# Размер LRU-кеша клавиатур, зависящих от токена вопроса или пользователя.
+# Разметка клавиатур неизменяемая (frozen), поэтому один объект безопасно отдавать повторно
+KEYBOARD_CACHE_SIZE = 1024
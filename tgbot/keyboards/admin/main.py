@@ -1,3 +1,5 @@
+from functools import cache
+
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
@@ -11,6 +13,7 @@ class ChangeRole(CallbackData, prefix="role"):
 
 
 # Основная клавиатура для команды /start
+@cache
 def admin_kb() -> InlineKeyboardMarkup:
     buttons = [
         [
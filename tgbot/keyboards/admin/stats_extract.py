@@ -1,8 +1,10 @@
 from datetime import datetime
+from functools import lru_cache
 
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from tgbot.keyboards import KEYBOARD_CACHE_SIZE
 from tgbot.keyboards.admin.main import AdminMenu
 
 
@@ -19,10 +21,21 @@ class DivisionStatsExtract(CallbackData, prefix="division_stats"):
     division: str
 
 
+class SlaStats(CallbackData, prefix="sla_stats"):
+    month: int
+    year: int
+    division: str
+
+
 # Выбор дат для выгрузки статистики
 def extract_kb() -> InlineKeyboardMarkup:
     current_date = datetime.now()
+    return _extract_kb(current_date.year, current_date.month)
+
 
+# Сетка месяцев меняется раз в месяц, поэтому кешируется по текущим году и месяцу
+@lru_cache(maxsize=2)
+def _extract_kb(current_year: int, current_month: int) -> InlineKeyboardMarkup:
     # Get month names in Russian
     month_names = {
         1: "Январь",
@@ -46,8 +59,8 @@ def extract_kb() -> InlineKeyboardMarkup:
         row = []
 
         # First month in the row
-        year1 = current_date.year
-        month1 = current_date.month - i
+        year1 = current_year
+        month1 = current_month - i
         if month1 <= 0:
             month1 += 12
             year1 -= 1
@@ -64,8 +77,8 @@ def extract_kb() -> InlineKeyboardMarkup:
 
         # Second month in the row (if exists)
         if i + 1 < 6:
-            year2 = current_date.year
-            month2 = current_date.month - (i + 1)
+            year2 = current_year
+            month2 = current_month - (i + 1)
             if month2 <= 0:
                 month2 += 12
                 year2 -= 1
@@ -96,6 +109,7 @@ def extract_kb() -> InlineKeyboardMarkup:
 
 
 # Выбор направления для выгрузки статистики
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def division_selection_kb(month: int, year: int) -> InlineKeyboardMarkup:
     """
     Клавиатура выбора направления для выгрузки статистики
@@ -127,6 +141,12 @@ def division_selection_kb(month: int, year: int) -> InlineKeyboardMarkup:
                 ).pack(),
             ),
         ],
+        [
+            InlineKeyboardButton(
+                text="⏱ SLA дежурных",
+                callback_data=SlaStats(month=month, year=year, division="ВСЕ").pack(),
+            ),
+        ],
         [
             InlineKeyboardButton(
                 text="↩️ К выбору месяца",
@@ -137,3 +157,38 @@ def division_selection_kb(month: int, year: int) -> InlineKeyboardMarkup:
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     return keyboard
+
+
+# Переключение направления в отчете SLA
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def sla_stats_kb(month: int, year: int, division: str) -> InlineKeyboardMarkup:
+    """
+    Клавиатура отчета SLA дежурных за месяц. Отчет строится по дневным агрегатам
+    (QuestionEventsRepo.get_sla_stats), поэтому переключение направления не нагружает БД
+
+    :param month: Выбранный месяц
+    :param year: Выбранный год
+    :param division: Текущее направление отчета
+    :return: Объект встроенной клавиатуры
+    """
+    divisions = (("🏢 НЦК", "НЦК"), ("🏭 НТП", "НТП"), ("📊 Все", "ВСЕ"))
+    buttons = [
+        [
+            InlineKeyboardButton(
+                text=f"✅ {text}" if value == division else text,
+                callback_data=SlaStats(month=month, year=year, division=value).pack(),
+            )
+            for text, value in divisions
+        ],
+        [
+            InlineKeyboardButton(
+                text="↩️ К выгрузке",
+                callback_data=MonthStatsExtract(
+                    menu="month", month=month, year=year
+                ).pack(),
+            ),
+        ],
+    ]
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
+    return keyboard
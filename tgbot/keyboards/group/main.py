@@ -1,6 +1,10 @@
+from functools import lru_cache
+
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from tgbot.keyboards import KEYBOARD_CACHE_SIZE
+
 
 class QuestionQualityDuty(CallbackData, prefix="q_quality_duty"):
     answer: bool = False
@@ -17,6 +21,7 @@ class FinishedQuestion(CallbackData, prefix="finished_q"):
     action: str
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def duty_start(
     user_id: int | str,
 ) -> InlineKeyboardMarkup:
@@ -34,6 +39,7 @@ def duty_start(
     return keyboard
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def reopened_question_kb(user_id: int | str) -> InlineKeyboardMarkup:
     """
     Клавиатура с освобождением вопроса после переоткрытия
@@ -60,6 +66,7 @@ def reopened_question_kb(user_id: int | str) -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def question_quality_duty_kb(
     token: str,
     allow_return: bool = True,
@@ -129,6 +136,7 @@ def question_quality_duty_kb(
     return keyboard
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def closed_question_duty_kb(
     token: str, allow_return: bool = True
 ) -> InlineKeyboardMarkup:
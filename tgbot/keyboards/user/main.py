@@ -1,4 +1,7 @@
-from typing import Sequence
+import uuid
+from datetime import datetime, timedelta
+from functools import cache, lru_cache
+from typing import Literal, Sequence
 
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import (
@@ -9,8 +12,11 @@ from aiogram.types import (
 )
 
 from infrastructure.database.models import Question
+from tgbot.keyboards import KEYBOARD_CACHE_SIZE
 from tgbot.keyboards.admin.main import AdminMenu
 
+EPOCH = datetime(1970, 1, 1)
+
 
 class MainMenu(CallbackData, prefix="menu"):
     menu: str
@@ -31,6 +37,32 @@ class ReturnQuestion(CallbackData, prefix="return_q"):
     token: str = None
 
 
+class ReturnQuestionsPage(CallbackData, prefix="rq_pg"):
+    """
+    Переход по страницам списка доступных к возврату вопросов.
+    Курсор упакован компактно, чтобы уложиться в 64 байта callback_data:
+    end_time — микросекунды с 1970-01-01, token — токен вопроса без дефисов
+    """
+
+    direction: Literal["next", "prev"]
+    end_time: int
+    token: str
+
+    @classmethod
+    def from_question(
+        cls, direction: Literal["next", "prev"], question: Question
+    ) -> "ReturnQuestionsPage":
+        return cls(
+            direction=direction,
+            end_time=(question.end_time - EPOCH) // timedelta(microseconds=1),
+            token=uuid.UUID(question.token).hex,
+        )
+
+    def cursor(self) -> tuple[datetime, str]:
+        """Курсор для QuestionsRepo.get_returnable_questions_page"""
+        return EPOCH + timedelta(microseconds=self.end_time), str(uuid.UUID(self.token))
+
+
 class CancelQuestion(CallbackData, prefix="cancel_q"):
     action: str
     token: str
@@ -41,6 +73,7 @@ class ActivityStatusToggle(CallbackData, prefix="activity_toggle"):
     token: str
 
 
+@cache
 def user_kb(is_role_changed: bool = False) -> InlineKeyboardMarkup:
     """
     Клавиатура главного меню.
@@ -72,6 +105,7 @@ def user_kb(is_role_changed: bool = False) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@cache
 def back_kb() -> InlineKeyboardMarkup:
     """
     Клавиатура для возврата в главное меню.
@@ -92,6 +126,7 @@ def back_kb() -> InlineKeyboardMarkup:
     return keyboard
 
 
+@cache
 def question_ask_kb(is_user_in_top: bool = False) -> InlineKeyboardMarkup:
     """
     Клавиатура для оформления вопроса.
@@ -125,6 +160,7 @@ def question_ask_kb(is_user_in_top: bool = False) -> InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def cancel_question_kb(token: str) -> InlineKeyboardMarkup:
     """
     Клавиатура с отменой вопроса и возвратом в главное меню.
@@ -146,6 +182,7 @@ def cancel_question_kb(token: str) -> InlineKeyboardMarkup:
     return keyboard
 
 
+@cache
 def finish_question_kb() -> ReplyKeyboardMarkup:
     """
     Клавиатура с отменой вопроса и возвратом в главное меню.
@@ -164,6 +201,7 @@ def finish_question_kb() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def question_quality_specialist_kb(
     token: str,
 ) -> InlineKeyboardMarkup:
@@ -214,6 +252,7 @@ def question_quality_specialist_kb(
     return keyboard
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def closed_question_specialist_kb(token: str) -> InlineKeyboardMarkup:
     """
     Клавиатура закрытого диалога для специалиста.
@@ -246,11 +285,15 @@ def closed_question_specialist_kb(token: str) -> InlineKeyboardMarkup:
     return keyboard
 
 
-def questions_list_kb(questions: Sequence[Question]) -> InlineKeyboardMarkup:
+def questions_list_kb(
+    questions: Sequence[Question], has_newer: bool = False, has_older: bool = False
+) -> InlineKeyboardMarkup:
     """
-    Клавиатура списка доступных к возврату вопросов
+    Клавиатура страницы списка доступных к возврату вопросов
 
-    :param Sequence[Question] questions: Список вопросов для отображения
+    :param Sequence[Question] questions: Список вопросов страницы (новые сверху)
+    :param bool has_newer: Есть ли более новые вопросы (кнопка "назад")
+    :param bool has_older: Есть ли более старые вопросы (кнопка "вперед")
     :return: Объект встроенной клавиатуры для закрытого диалога
     """
     buttons = []
@@ -272,6 +315,28 @@ def questions_list_kb(questions: Sequence[Question]) -> InlineKeyboardMarkup:
             ]
         )
 
+    pagination = []
+    if questions and has_newer:
+        pagination.append(
+            InlineKeyboardButton(
+                text="⬅️",
+                callback_data=ReturnQuestionsPage.from_question(
+                    "prev", questions[0]
+                ).pack(),
+            )
+        )
+    if questions and has_older:
+        pagination.append(
+            InlineKeyboardButton(
+                text="➡️",
+                callback_data=ReturnQuestionsPage.from_question(
+                    "next", questions[-1]
+                ).pack(),
+            )
+        )
+    if pagination:
+        buttons.append(pagination)
+
     buttons.append(
         [
             InlineKeyboardButton(
@@ -283,6 +348,7 @@ def questions_list_kb(questions: Sequence[Question]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def question_confirm_kb(token: str) -> InlineKeyboardMarkup:
     """
     Клавиатура подтверждения возврата вопроса в работу
@@ -307,6 +373,7 @@ def question_confirm_kb(token: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def activity_status_toggle_kb(
     token: str,
     user_id: str | int,
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, Update
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Собирает альбомы (сообщения с одним media_group_id) в один апдейт.
+
+    Работает в два шага вокруг ChatOrderingMiddleware. Сам объект регистрируется до очереди
+    чата: первое сообщение альбома сразу встает в очередь, остальные части дописываются в его
+    список и дальше не идут — ни в очередь, ни в мидлвари БД, ни в хендлеры.
+    Мидлварь wait регистрируется после очереди: уже заняв место в очереди чата, первое
+    сообщение ждет latency секунд, пока подтянутся остальные, и уходит в хендлеры со списком
+    всех сообщений в data["album"]. Так альбом не обгоняют сообщения, пришедшие после него.
+    """
+
+    def __init__(self, latency: float = 0.5) -> None:
+        self.latency = latency
+        self._albums: dict[tuple[int, str], list[Message]] = {}
+
+    @staticmethod
+    def get_key(event: Update) -> tuple[int, str] | None:
+        message = event.message
+        if message is None or not message.media_group_id:
+            return None
+        return message.chat.id, message.media_group_id
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = self.get_key(event)
+        if key is None:
+            return await handler(event, data)
+
+        album = self._albums.get(key)
+        if album is not None:
+            album.append(event.message)
+            return None
+
+        album = self._albums[key] = [event.message]
+        data["album"] = album
+        try:
+            return await handler(event, data)
+        finally:
+            if self._albums.get(key) is album:
+                del self._albums[key]
+
+    async def wait(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Ждет остальные части альбома уже внутри очереди чата."""
+        key = self.get_key(event)
+        album = data.get("album")
+        if key is not None and album is not None and self._albums.get(key) is album:
+            await asyncio.sleep(self.latency)
+            del self._albums[key]
+            album.sort(key=lambda item: item.message_id)
+        return await handler(event, data)
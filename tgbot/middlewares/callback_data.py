@@ -0,0 +1,22 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from tgbot.services.callbacks import decode_callback
+
+
+class CallbackDataMiddleware(BaseMiddleware):
+    """
+    Разбирает callback_data один раз на апдейт и кладет результат в data["parsed_callback"].
+    Фильтры FastCallback всех роутеров используют уже разобранный объект.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["parsed_callback"] = decode_callback(event.data) if event.data else None
+        return await handler(event, data)
@@ -5,6 +5,13 @@ from aiogram.types import Message
 
 
 class ConfigMiddleware(BaseMiddleware):
+    """
+    Прокидывает общий объект Config в хендлеры.
+
+    Объект один на весь процесс (см. get_config), поэтому обновление настроек по SIGHUP
+    сразу видно во всех хендлерах без перерегистрации мидлвари.
+    """
+
     def __init__(self, config) -> None:
         self.config = config
 
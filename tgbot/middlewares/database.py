@@ -1,21 +1,43 @@
 import logging
-from typing import Any, Awaitable, Callable, Dict, Union
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
 
 from aiogram import BaseMiddleware, Bot
 from aiogram.types import CallbackQuery, Message
-from sqlalchemy.exc import DBAPIError, DisconnectionError, OperationalError
 
 from infrastructure.database.models import User
 from infrastructure.database.repo.requests import RequestsRepo
-from tgbot.config import Config, load_config
+from infrastructure.database.repo.users import USER_CACHE_FIELDS
+from tgbot.config import Config
 from tgbot.keyboards.group.events import on_user_leave_kb
-from tgbot.services.logger import setup_logging
+from tgbot.services.cache import cache, user_key
+from tgbot.services.circuit_breaker import (
+    RETRYABLE_ERRORS,
+    CircuitOpenError,
+    get_breaker,
+    is_transient_db_error,
+)
+from tgbot.services.permissions import Capability, capabilities_for_role
+from tgbot.services.rate_limiter import AsyncRateLimiter
 
-config = load_config(".env")
-
-setup_logging()
 logger = logging.getLogger(__name__)
 
+# Время жизни пользователя в общем кеше, секунд. Изменения ролей через бота
+# инвалидируют кеш сразу, изменения в обход бота подхватываются по истечении TTL
+USER_CACHE_TTL = 60
+# Сколько секунд помнить, что пользователя нет в БД. Новый сотрудник получит доступ
+# не позже, чем через это время
+MISSING_USER_TTL = 2 * 60
+# Отметка отсутствующего пользователя в кеше
+MISSING_USER = {}
+
+# Лимит апдейтов от одного пользователя, которого нет в кеше или нет в БД:
+# USER_RATE в секунду, всплеск до USER_BURST
+USER_RATE = 5
+USER_BURST = 30
+# Сколько пользователей помнит ограничитель частоты
+USER_BUCKETS_MAXSIZE = 10000
+
 
 class DatabaseMiddleware(BaseMiddleware):
     def __init__(
@@ -26,6 +48,75 @@ class DatabaseMiddleware(BaseMiddleware):
         self.bot = bot
         self.config = config
 
+        self.main_breaker = get_breaker("STPMain")
+        self.questioner_breaker = get_breaker("QuestionerBot")
+        self._buckets: OrderedDict[int, AsyncRateLimiter] = OrderedDict()
+
+    def allow_update(self, user_id: int) -> bool:
+        """
+        Проверяет лимит апдейтов пользователя (token bucket). Не обращается к БД.
+        Применяется только к пользователям, которых нет в кеше или нет в БД
+        """
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = AsyncRateLimiter(
+                rate=USER_RATE, capacity=USER_BURST
+            )
+            if len(self._buckets) > USER_BUCKETS_MAXSIZE:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        return bucket.try_acquire()
+
+    async def resolve_user(self, main_repo: RequestsRepo, user_id: int) -> User:
+        """
+        Получает пользователя из общего кеша, при промахе — из БД через предохранитель.
+        Пока предохранитель разомкнут, обслуживаются только пользователи из кеша.
+        :raises CircuitOpenError: Предохранитель разомкнут и пользователя нет в кеше
+        """
+        cached = await cache.get(user_key(user_id))
+        if cached == MISSING_USER:
+            return None
+        if cached is not None:
+            return User(**cached)
+
+        version = await cache.version(user_key(user_id))
+        user = await self.main_breaker.call(
+            lambda: main_repo.users.get_user(user_id=user_id)
+        )
+
+        if user:
+            await cache.set(
+                user_key(user_id),
+                {field: getattr(user, field) for field in USER_CACHE_FIELDS},
+                ttl=USER_CACHE_TTL,
+                version=version,
+            )
+        else:
+            await cache.set(
+                user_key(user_id), MISSING_USER, ttl=MISSING_USER_TTL, version=version
+            )
+        return user
+
+    async def reject_unknown_user(self, event: Union[Message, CallbackQuery]) -> None:
+        """Исключает из форума или отказывает в доступе пользователю, которого нет в БД."""
+        if event.message_thread_id:
+            await self.bot.ban_chat_member(
+                chat_id=event.chat.id,
+                user_id=event.from_user.id,
+            )
+            await event.answer(
+                text=f"""<b>🙅‍♂️ Исключение</b>
+
+Пользователь <code>{event.from_user.id}</code> исключен
+Причина: не найден в базе""",
+                reply_markup=on_user_leave_kb(
+                    user_id=event.from_user.id,
+                ),
+            )
+        else:
+            await event.answer("У тебя нет прав использовать бота")
+
     async def __call__(
         self,
         handler: Callable[
@@ -34,117 +125,124 @@ class DatabaseMiddleware(BaseMiddleware):
         event: Union[Message, CallbackQuery],
         data: Dict[str, Any],
     ) -> Any:
-        max_retries = 3
-        retry_count = 0
+        user_id = event.from_user.id
+        cached = await cache.get(user_key(user_id))
+        # Быстрый отказ до открытия сессий: флуд от неизвестных пользователей не нагружает БД.
+        # Известных пользователей не ограничиваем — их апдейты (серии, альбомы) терять нельзя
+        known = cached is not None and cached != MISSING_USER
+        if not known and not self.allow_update(user_id):
+            logger.debug(
+                "[Middleware] Апдейт от неизвестного %s отброшен лимитом частоты", user_id
+            )
+            return None
+        if (
+            not event.from_user.is_bot
+            and self.thread_id(event)
+            and cached == MISSING_USER
+        ):
+            # Исключение из топика уже отправлено, когда отсутствие пользователя попало в кеш
+            logger.debug("[Middleware] Апдейт от неизвестного %s отброшен", user_id)
+            return None
+
+        try:
+            # Use separate sessions for different databases
+            async with self.main_session_pool() as main_session:
+                async with self.questioner_session_pool() as questioner_session:
+                    # Создаем репозитории для разных БД
+                    main_repo = RequestsRepo(main_session)  # Для БД STPMain
+                    questioner_repo = RequestsRepo(
+                        questioner_session
+                    )  # Для БД QuestionerBot
+
+                    user: User = await self.resolve_user(
+                        main_repo, user_id=event.from_user.id
+                    )
 
-        while retry_count < max_retries:
-            try:
-                # Use separate sessions for different databases
-                async with self.main_session_pool() as main_session:
-                    async with self.questioner_session_pool() as questioner_session:
-                        # Создаем репозитории для разных БД
-                        main_repo = RequestsRepo(main_session)  # Для БД STPMain
-                        questioner_repo = RequestsRepo(
-                            questioner_session
-                        )  # Для БД QuestionerBot
-
-                        user: User = await main_repo.users.get_user(
-                            user_id=event.from_user.id
-                        )
+                    capabilities = capabilities_for_role(user.Role if user else None)
 
-                        message_thread_id = None
-                        is_bot = False
-
-                        if isinstance(event, Message):
-                            message_thread_id = event.message_thread_id
-                            is_bot = event.from_user.is_bot
-
-                            if hasattr(event, "edit_date") and event.edit_date:
-                                logger.info(
-                                    f"[Редактирование] Пользователь {event.from_user.username} ({event.from_user.id}) "
-                                    f"отредактировал сообщение в топике {message_thread_id}"
-                                )
-
-                        elif isinstance(event, CallbackQuery) and event.message:
-                            message_thread_id = getattr(
-                                event.message, "message_thread_id", None
-                            )
-                            is_bot = event.from_user.is_bot
-
-                        # User validation logic remains the same...
-                        if not user and not is_bot:
-                            if event.message_thread_id:
-                                await self.bot.ban_chat_member(
-                                    chat_id=event.chat.id,
-                                    user_id=event.from_user.id,
-                                )
-                                await event.answer(
-                                    text=f"""<b>🙅‍♂️ Исключение</b>
+                    message_thread_id = self.thread_id(event)
+                    is_bot = event.from_user.is_bot
 
-Пользователь <code>{event.from_user.id}</code> исключен
-Причина: не найден в базе""",
-                                    reply_markup=on_user_leave_kb(
-                                        user_id=event.from_user.id,
-                                    ),
-                                )
-                            else:
-                                await event.answer("У тебя нет прав использовать бота")
-                            return
-
-                        if (
-                            user
-                            and user.Role not in [2, 3, 10]
-                            and message_thread_id
-                            and not is_bot
-                        ):
-                            await self.bot.ban_chat_member(
-                                chat_id=event.chat.id,
-                                user_id=event.from_user.id,
-                            )
-                            await event.answer(
-                                text=f"""<b>🙅‍♂️ Исключение</b>
+                    if isinstance(event, Message) and event.edit_date:
+                        logger.info(
+                            "[Редактирование] Пользователь %s (%s) отредактировал сообщение в топике %s",
+                            event.from_user.username,
+                            event.from_user.id,
+                            message_thread_id,
+                        )
+
+                    # Из топиков неизвестного пользователя исключаем. В личке апдейт идет
+                    # в хендлеры с user=None, как и без мидлвари: они отвечают сами
+                    if not user and not is_bot and message_thread_id:
+                        await self.reject_unknown_user(event)
+                        return
+
+                    if (
+                        user
+                        and not capabilities & Capability.FORUM_ACCESS
+                        and message_thread_id
+                        and not is_bot
+                    ):
+                        await self.bot.ban_chat_member(
+                            chat_id=event.chat.id,
+                            user_id=event.from_user.id,
+                        )
+                        await event.answer(
+                            text=f"""<b>🙅‍♂️ Исключение</b>
 
 Пользователь <code>{user.FIO}</code> исключен
 Причина: недостаточно прав для входа""",
-                                reply_markup=on_user_leave_kb(
-                                    user_id=event.from_user.id, change_role=True
-                                ),
-                            )
-                            return
-
-                        data["main_repo"] = main_repo
-                        data["main_session"] = main_session
-                        data["questioner_session"] = questioner_session
-                        data["questions_repo"] = questioner_repo
-                        data["user"] = user
-
-                        result = await handler(event, data)
-                        return result
-
-            except (OperationalError, DBAPIError, DisconnectionError) as e:
-                # Retry logic...
-                if "Connection is busy" in str(e) or "HY000" in str(e):
-                    retry_count += 1
-                    logger.warning(
-                        f"[Middleware] Database connection error, повтор {retry_count}/{max_retries}: {e}"
-                    )
-                    if retry_count >= max_retries:
-                        logger.error(
-                            f"[Middleware] Все попытки подключения к БД исчерпаны: {e}"
+                            reply_markup=on_user_leave_kb(
+                                user_id=event.from_user.id, change_role=True
+                            ),
                         )
-                        if isinstance(event, Message):
-                            try:
-                                await event.reply(
-                                    "⚠️ Временные проблемы с базой данных. Попробуйте позже."
-                                )
-                            except:
-                                pass
-                        return None
-                else:
-                    logger.error(f"[Middleware] Критическая ошибка БД: {e}")
-                    return None
-            except Exception as e:
-                logger.error(f"[Middleware] Неожиданная ошибка: {e}")
-                return None
-
+                        return
+
+                    data["main_repo"] = main_repo
+                    data["main_session"] = main_session
+                    data["questioner_session"] = questioner_session
+                    data["questions_repo"] = questioner_repo
+                    data["user"] = user
+                    data["capabilities"] = capabilities
+                    data["main_breaker"] = self.main_breaker
+                    data["questioner_breaker"] = self.questioner_breaker
+
+                    # Хендлер целиком не повторяем: в нем уже могли быть побочные эффекты.
+                    # Запросы к БД вопросника учитывает предохранитель, подключенный к движку
+                    if self.questioner_breaker.is_open:
+                        raise CircuitOpenError(self.questioner_breaker.name)
+                    return await handler(event, data)
+
+        except CircuitOpenError as e:
+            logger.warning("[Middleware] БД %s недоступна, апдейт отклонен", e)
+            await self.notify_db_problems(event)
+            return None
+        except RETRYABLE_ERRORS as e:
+            if is_transient_db_error(e):
+                logger.warning("[Middleware] Временная ошибка БД: %s", e)
+                await self.notify_db_problems(event)
+            else:
+                logger.error("[Middleware] Критическая ошибка БД: %s", e)
+            return None
+        except Exception as e:
+            logger.error("[Middleware] Неожиданная ошибка: %s", e)
+            return None
+
+    @staticmethod
+    def thread_id(event: Union[Message, CallbackQuery]) -> Optional[int]:
+        """Топик, из которого пришел апдейт (None — не из топика)."""
+        if isinstance(event, Message):
+            return event.message_thread_id
+        if event.message:
+            return getattr(event.message, "message_thread_id", None)
         return None
+
+    @staticmethod
+    async def notify_db_problems(event: Union[Message, CallbackQuery]) -> None:
+        if isinstance(event, Message):
+            try:
+                await event.reply(
+                    "⚠️ Временные проблемы с базой данных. Попробуйте позже."
+                )
+            except Exception:
+                pass
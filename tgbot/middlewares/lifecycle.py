@@ -0,0 +1,28 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from tgbot.services.lifecycle import LifecycleManager
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Считает апдейты, которые обрабатываются прямо сейчас.
+    По этому счетчику LifecycleManager дожидается завершения хендлеров при остановке.
+    """
+
+    def __init__(self, lifecycle: LifecycleManager) -> None:
+        self.lifecycle = lifecycle
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.lifecycle.update_started()
+        try:
+            return await handler(event, data)
+        finally:
+            self.lifecycle.update_finished()
@@ -1,14 +1,13 @@
 import logging
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
 from infrastructure.database.models import MessagesPair
 from infrastructure.database.repo.requests import RequestsRepo
-from tgbot.services.logger import setup_logging
+from tgbot.services.edits import EditCoalescer
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -18,8 +17,18 @@ class MessagePairingMiddleware(BaseMiddleware):
 
     This middleware finds the corresponding message pair when a message is edited,
     allowing handlers to edit the correct message instead of sending a new one.
+
+    With an EditCoalescer, repeated edits of a message whose previous edit is still pending
+    reuse the already resolved target and skip the database lookup. Handlers receive the
+    coalescer as data["edit_coalescer"] and should submit edits through it.
+
+    If the edited message is still buffered in data["relay"] (CopyRelay), the lookup waits
+    until its pair has been stored.
     """
 
+    def __init__(self, coalescer: EditCoalescer = None) -> None:
+        self.coalescer = coalescer
+
     async def __call__(
         self,
         handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
@@ -30,6 +39,23 @@ class MessagePairingMiddleware(BaseMiddleware):
         if not (hasattr(event, "edit_date") and event.edit_date):
             return await handler(event, data)
 
+        if self.coalescer:
+            data["edit_coalescer"] = self.coalescer
+
+            # Предыдущая правка этого сообщения еще ждет отправки — цель уже известна
+            pending = self.coalescer.get_pending(event.chat.id, event.message_id)
+            if pending:
+                data["edit_target_chat_id"] = pending.target_chat_id
+                data["edit_target_message_id"] = pending.target_message_id
+                data["edit_target_thread_id"] = pending.target_thread_id
+                data["edit_direction"] = pending.direction
+                return await handler(event, data)
+
+        # Сообщение могло еще не переслаться: пара появится в БД после флаша буфера
+        relay = data.get("relay")
+        if relay:
+            await relay.wait_relayed(event.chat.id, event.message_id)
+
         # Получаем репозиторий из данных (должно быть предоставлено DatabaseMiddleware)
         questions_repo: RequestsRepo = data.get("questions_repo")
         if not questions_repo:
@@ -61,19 +87,24 @@ class MessagePairingMiddleware(BaseMiddleware):
 
                 data["message_connection"] = connection
                 logger.info(
-                    f"[Редактирование]: Найдена пара для редактирования {event.chat.id}:{event.message_id} -> "
-                    f"{data['edit_target_chat_id']}:{data['edit_target_message_id']}"
+                    "[Редактирование]: Найдена пара для редактирования %s:%s -> %s:%s",
+                    event.chat.id,
+                    event.message_id,
+                    data["edit_target_chat_id"],
+                    data["edit_target_message_id"],
                 )
             else:
                 # Пара не найдена - скорее всего сообщение не было записано в БД
                 logger.warning(
-                    f"[Редактирование]: Не найдена пара для редактирования: {event.chat.id}:{event.message_id}"
+                    "[Редактирование]: Не найдена пара для редактирования: %s:%s",
+                    event.chat.id,
+                    event.message_id,
                 )
                 data["edit_target_chat_id"] = None
                 data["edit_target_message_id"] = None
 
         except Exception as e:
-            logger.error(f"Error in MessagePairingMiddleware: {e}")
+            logger.error("Error in MessagePairingMiddleware: %s", e)
             data["edit_target_chat_id"] = None
             data["edit_target_message_id"] = None
 
@@ -117,11 +148,70 @@ async def store_message_connection(
             direction=direction,
         )
         logger.info(
-            f"[Редактирование] Сохраняем пару из сообщений: {direction} - "
-            f"юзер:{user_chat_id}:{user_message_id} <-> "
-            f"топик:{topic_chat_id}:{topic_message_id}"
+            "[Редактирование] Сохраняем пару из сообщений: %s - юзер:%s:%s <-> топик:%s:%s",
+            direction,
+            user_chat_id,
+            user_message_id,
+            topic_chat_id,
+            topic_message_id,
         )
         return connection
     except Exception as e:
-        logger.error(f"Failed to store message connection: {e}")
+        logger.error("Failed to store message connection: %s", e)
+        raise
+
+
+async def store_message_connections(
+    questions_repo: RequestsRepo,
+    relayed: Sequence[tuple[int, int]],
+    user_chat_id: int,
+    topic_chat_id: int,
+    topic_thread_id: Optional[int],
+    question_token: str,
+    direction: str,
+) -> list[MessagesPair]:
+    """
+    Helper function to store several message connections in one batch (e.g. a relayed burst or album).
+
+    Args:
+        questions_repo: Repository instance
+        relayed: Pairs of (source message ID, relayed message ID)
+        user_chat_id: User chat ID
+        topic_chat_id: Forum chat ID
+        topic_thread_id: Thread ID in forum topic
+        question_token: Associated question token
+        direction: 'user_to_topic' or 'topic_to_user'
+
+    Returns:
+        Created MessagesPair instances
+    """
+    pairs = []
+    for source_message_id, relayed_message_id in relayed:
+        user_message_id, topic_message_id = (
+            (source_message_id, relayed_message_id)
+            if direction == "user_to_topic"
+            else (relayed_message_id, source_message_id)
+        )
+        pairs.append(
+            {
+                "user_chat_id": user_chat_id,
+                "user_message_id": user_message_id,
+                "topic_chat_id": topic_chat_id,
+                "topic_message_id": topic_message_id,
+                "topic_thread_id": topic_thread_id,
+                "question_token": question_token,
+                "direction": direction,
+            }
+        )
+
+    try:
+        connections = await questions_repo.messages_pairs.add_pairs(pairs)
+        logger.info(
+            "[Редактирование] Сохранено пар из сообщений: %s (%s)",
+            len(connections),
+            direction,
+        )
+        return connections
+    except Exception as e:
+        logger.error("Failed to store message connections: %s", e)
         raise
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+
+class ChatOrderingMiddleware(BaseMiddleware):
+    """
+    Упорядочивает обработку апдейтов внутри одного чата.
+
+    У каждого чата (для форумов — каждого топика) своя очередь: апдейты из него обрабатываются
+    строго по одному в порядке поступления, поэтому серия сообщений специалиста пересылается
+    в топик в том же порядке, а правка не обгоняет сохранение пары сообщений.
+    Разные чаты обрабатываются параллельно, общее кол-во одновременно работающих хендлеров
+    ограничено семафором.
+    """
+
+    def __init__(self, concurrency: int = 100) -> None:
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._waiters: dict[Hashable, int] = {}
+
+    @staticmethod
+    def get_key(data: Dict[str, Any]) -> Hashable | None:
+        """Ключ очереди: чат и топик из контекста, который заполняет aiogram."""
+        chat = data.get("event_chat")
+        if chat is None:
+            return None
+        return chat.id, data.get("event_thread_id")
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = self.get_key(data)
+        if key is None:
+            async with self.semaphore:
+                return await handler(event, data)
+
+        # asyncio.Lock пропускает ожидающих в порядке очереди, этим и держится порядок апдейтов
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+
+        try:
+            async with lock:
+                async with self.semaphore:
+                    return await handler(event, data)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
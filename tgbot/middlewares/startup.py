@@ -0,0 +1,39 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+class FirstUpdateMiddleware(BaseMiddleware):
+    """
+    Замеряет время от запуска бота до обработки первого обновления.
+
+    Пишет в лог одну строку после первого апдейта, дальше ничего не делает.
+    Используется вместе с benchmarks/startup.py для контроля времени холодного старта.
+    """
+
+    def __init__(self, started_at: float) -> None:
+        self.started_at = started_at
+        self.measured = False
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self.measured:
+            return await handler(event, data)
+
+        self.measured = True
+        try:
+            return await handler(event, data)
+        finally:
+            logger.info(
+                "[Старт] Первое обновление обработано через %.0f мс после запуска",
+                (time.perf_counter() - self.started_at) * 1000,
+            )
@@ -1,31 +1,117 @@
+import asyncio
 import logging
 import re
+from typing import Any, Optional, Sequence
 
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
-from tgbot.services.logger import setup_logging
+from tgbot.services.rate_limiter import AsyncRateLimiter
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
+# Общий лимит на снятие клавиатур, чтобы фоновые правки не съедали лимиты Bot API
+buttons_limiter = AsyncRateLimiter(rate=20)
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def get_state_and_data(state: FSMContext) -> tuple[Optional[str], dict[str, Any]]:
+    """
+    Получает состояние и данные FSM. С PipelinedRedisStorage — за одно обращение к Redis.
+    :param state: Контекст FSM
+    :return: Состояние и данные
+    """
+    if hasattr(state.storage, "get_state_and_data"):
+        return await state.storage.get_state_and_data(state.key)
+    return await state.get_state(), await state.get_data()
+
+
+async def swap_state_value(state: FSMContext, dict_key: str, value: Any) -> Any:
+    """
+    Заменяет значение в данных FSM и возвращает прежнее.
+    С PipelinedRedisStorage — атомарно и за один круг WATCH/MULTI.
+    :param state: Контекст FSM
+    :param dict_key: Ключ в данных FSM
+    :param value: Новое значение
+    :return: Прежнее значение или None
+    """
+    if hasattr(state.storage, "modify_data"):
+
+        def swap(current: dict[str, Any]) -> tuple[Any, dict[str, Any]]:
+            previous = current.get(dict_key)
+            current[dict_key] = value
+            return previous, current
+
+        return await state.storage.modify_data(state.key, swap)
+
+    previous = await state.get_value(dict_key)
+    await state.update_data({dict_key: value})
+    return previous
+
+
+async def _remove_reply_markup(bot: Bot, chat_id: int, message_id: int) -> None:
+    for _ in range(2):
+        async with buttons_limiter:
+            try:
+                await bot.edit_message_reply_markup(
+                    chat_id=chat_id, message_id=message_id, reply_markup=None
+                )
+                return
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                # Сообщение удалено, слишком старое или уже без кнопок — id просто отбрасывается
+                logger.debug(
+                    "[Кнопки] Сообщение %s в чате %s нельзя изменить: %s",
+                    message_id,
+                    chat_id,
+                    e,
+                )
+                return
+            except Exception as e:
+                logger.warning(
+                    "[Кнопки] Не удалось отключить кнопки сообщения %s в чате %s: %s",
+                    message_id,
+                    chat_id,
+                    e,
+                )
+                return
+
+
+async def _remove_reply_markups(
+    bot: Bot, chat_id: int, message_ids: Sequence[int]
+) -> None:
+    await asyncio.gather(
+        *(_remove_reply_markup(bot, chat_id, msg_id) for msg_id in set(message_ids))
+    )
+
 
 async def disable_previous_buttons(message: Message, state: FSMContext):
-    """Функция для отключения inline кнопок в сообщениях"""
-    state_data = await state.get_data()
-    messages_with_buttons = state_data.get("messages_with_buttons", [])
-
-    for msg_id in messages_with_buttons:
-        try:
-            await message.bot.edit_message_reply_markup(
-                chat_id=message.chat.id, message_id=msg_id, reply_markup=None
-            )
-        except Exception as e:
-            # Handle case where message might be deleted or not editable
-            print(f"Could not disable buttons for message {msg_id}: {e}")
-
-    # Clear the list after disabling buttons
-    await state.update_data(messages_with_buttons=[])
+    """
+    Функция для отключения inline кнопок в сообщениях.
+    Список сообщений сразу очищается, а сами кнопки снимаются в фоне с ограничением
+    частоты, поэтому шаг FSM не ждет ответов Bot API
+    """
+    # Список забирается и очищается одной атомарной операцией
+    messages_with_buttons = (
+        await swap_state_value(state, "messages_with_buttons", []) or []
+    )
+    if not messages_with_buttons:
+        return
+
+    task = asyncio.create_task(
+        _remove_reply_markups(message.bot, message.chat.id, messages_with_buttons)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def wait_background_tasks() -> None:
+    """Дожидается фонового снятия кнопок. Используется при остановке бота."""
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
 
 
 async def check_premium_emoji(message: Message) -> tuple[bool, list[str]]:
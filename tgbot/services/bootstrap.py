@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import BotCommand
+
+logger = logging.getLogger(__name__)
+
+# Сколько доверяем сохраненному хешу. После истечения профиль сверяется с Telegram заново,
+# на случай если его поменяли вручную через BotFather
+PROFILE_CACHE_TTL = 24 * 60 * 60
+PROFILE_CACHE_PATH = Path("cache/bot_profile.hash")
+
+
+@dataclass(frozen=True)
+class BotProfile:
+    """
+    Желаемое состояние профиля бота в Telegram.
+
+    Attributes
+    ----------
+    commands : tuple[BotCommand, ...]
+        Команды меню бота.
+    name : Optional[str]
+        Имя бота. None — имя не управляется ботом.
+    description : Optional[str]
+        Описание бота. None — описание не управляется ботом.
+    """
+
+    commands: tuple[BotCommand, ...] = field(default_factory=tuple)
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+    def digest(self) -> str:
+        """Хеш желаемого состояния, по нему определяем, нужно ли что-то менять."""
+        payload = {
+            "commands": [
+                [command.command, command.description] for command in self.commands
+            ],
+            "name": self.name,
+            "description": self.description,
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def _read_cached_digest(bot: Bot, redis=None) -> Optional[str]:
+    if redis is not None:
+        value = await redis.get(f"questioner:bot_profile:{bot.id}")
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    try:
+        if time.time() - PROFILE_CACHE_PATH.stat().st_mtime > PROFILE_CACHE_TTL:
+            return None
+        return PROFILE_CACHE_PATH.read_text().strip()
+    except OSError:
+        return None
+
+
+async def _write_cached_digest(bot: Bot, digest: str, redis=None) -> None:
+    if redis is not None:
+        await redis.set(
+            f"questioner:bot_profile:{bot.id}", digest, ex=PROFILE_CACHE_TTL
+        )
+        return
+
+    try:
+        PROFILE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        PROFILE_CACHE_PATH.write_text(digest)
+    except OSError as e:
+        logger.warning("[Старт] Не удалось сохранить хеш профиля бота: %s", e)
+
+
+async def bootstrap_bot_profile(bot: Bot, profile: BotProfile, redis=None) -> bool:
+    """
+    Приводит профиль бота (команды, имя, описание) к желаемому состоянию.
+
+    Если хеш желаемого состояния совпадает с сохраненным, в Bot API не ходим вовсе.
+    Иначе один раз получаем текущий профиль, применяем только отличающиеся части
+    параллельно и сохраняем хеш. При нескольких репликах хеш хранится в Redis.
+
+    :param bot: Экземпляр бота
+    :param profile: Желаемый профиль
+    :param redis: Клиент Redis для общего кеша, если используется
+    :return: Были ли изменения в профиле
+    """
+    digest = profile.digest()
+
+    try:
+        cached_digest = await _read_cached_digest(bot, redis)
+    except Exception as e:
+        logger.warning("[Старт] Не удалось прочитать хеш профиля бота: %s", e)
+        cached_digest = None
+
+    if cached_digest == digest:
+        logger.info("[Старт] Профиль бота не изменился, пропускаем настройку")
+        return False
+
+    current_commands, current_name, current_description = await asyncio.gather(
+        bot.get_my_commands(),
+        bot.get_my_name(),
+        bot.get_my_description(),
+    )
+
+    updates = {}
+    if list(current_commands) != list(profile.commands):
+        updates["commands"] = bot.set_my_commands(commands=list(profile.commands))
+    if profile.name is not None and current_name.name != profile.name:
+        updates["name"] = bot.set_my_name(name=profile.name)
+    if (
+        profile.description is not None
+        and current_description.description != profile.description
+    ):
+        updates["description"] = bot.set_my_description(
+            description=profile.description
+        )
+
+    if updates:
+        await asyncio.gather(*updates.values())
+        logger.info("[Старт] Обновлен профиль бота: %s", ", ".join(updates))
+    else:
+        logger.info("[Старт] Профиль бота уже актуален")
+
+    try:
+        await _write_cached_digest(bot, digest, redis)
+    except Exception as e:
+        logger.warning("[Старт] Не удалось сохранить хеш профиля бота: %s", e)
+
+    return bool(updates)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+# Сколько живет счетчик версий ключа в Redis, секунд. Должно быть больше TTL любого значения
+VERSION_TTL = 24 * 60 * 60
+
+
+class SharedCache:
+    """
+    Двухуровневый кеш, общий для всех реплик бота.
+
+    L1 — словарь в памяти процесса с коротким TTL, L2 — Redis. Инвалидация ключа удаляет его
+    из обоих уровней и рассылается остальным репликам через pub/sub, чтобы они сбросили свой L1.
+    Без Redis (USE_REDIS=False) работает только L1.
+    Значения должны сериализоваться в JSON.
+
+    Каждая инвалидация увеличивает версию ключа. Значение, прочитанное из БД, записывается
+    в кеш с версией, полученной через version() до чтения: если ключ за это время
+    инвалидировали, устаревшее значение не записывается.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "questioner:cache",
+        l1_ttl: float = 60,
+        l1_maxsize: int = 10000,
+    ) -> None:
+        self.namespace = namespace
+        self.channel = f"{namespace}:invalidate"
+        self.l1_ttl = l1_ttl
+        self.l1_maxsize = l1_maxsize
+
+        self.redis = None
+        self._l1: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        # Версии ключей, инвалидированных этим процессом: номер по общему счетчику инвалидаций.
+        # Хранятся только последние l1_maxsize ключей; у остальных версия равна номеру последней
+        # вытесненной записи, поэтому после вытеснения версия ключа не возвращается к старой
+        self._versions: OrderedDict[str, int] = OrderedDict()
+        self._invalidations = 0
+        self._evicted_version = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    async def setup(self, redis) -> None:
+        """
+        Подключает Redis как второй уровень и подписывается на инвалидации других реплик.
+        :param redis: Клиент redis.asyncio.Redis
+        """
+        self.redis = redis
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def _listen(self, pubsub) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    keys = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                self._drop_local(keys)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("[Кеш] Подписка на инвалидации остановлена: %s", e)
+        finally:
+            await pubsub.aclose()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _version_key(self, key: str) -> str:
+        return f"{self.namespace}:version:{key}"
+
+    def _drop_local(self, keys) -> None:
+        for key in keys:
+            self._l1.pop(key, None)
+            self._invalidations += 1
+            self._versions[key] = self._invalidations
+            self._versions.move_to_end(key)
+        while len(self._versions) > self.l1_maxsize:
+            _, self._evicted_version = self._versions.popitem(last=False)
+
+    def _local_version(self, key: str) -> int:
+        return self._versions.get(key, self._evicted_version)
+
+    def _set_l1(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.l1_ttl if ttl is None else min(ttl, self.l1_ttl)
+        self._l1[key] = (value, time.monotonic() + ttl)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_maxsize:
+            self._l1.popitem(last=False)
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        """
+        Получает значение из кеша: сначала из L1, затем из Redis.
+        :param key: Ключ
+        :param default: Значение при промахе
+        """
+        cached = self._l1.get(key)
+        if cached is not None:
+            value, expires_at = cached
+            if time.monotonic() < expires_at:
+                return value
+            del self._l1[key]
+
+        if self.redis is None:
+            return default
+
+        try:
+            raw = await self.redis.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning("[Кеш] Ошибка чтения %s из Redis: %s", key, e)
+            return default
+        if raw is None:
+            return default
+
+        value = json.loads(raw)
+        self._set_l1(key, value)
+        return value
+
+    async def version(self, key: str) -> tuple[int, int]:
+        """
+        Текущая версия ключа. Запрашивается до чтения значения из БД и передается в set().
+        :param key: Ключ
+        """
+        remote = 0
+        if self.redis is not None:
+            try:
+                remote = int(await self.redis.get(self._version_key(key)) or 0)
+            except Exception as e:
+                logger.warning("[Кеш] Ошибка чтения версии %s из Redis: %s", key, e)
+        return self._local_version(key), remote
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = 600,
+        version: Optional[tuple[int, int]] = None,
+    ) -> None:
+        """
+        Записывает значение в оба уровня кеша.
+        :param key: Ключ
+        :param value: JSON-сериализуемое значение
+        :param ttl: Время жизни в секундах; в L1 значение живет не дольше l1_ttl
+        :param version: Версия из version(). Если ключ с тех пор инвалидировали, запись пропускается
+        """
+        if version is not None and self._local_version(key) != version[0]:
+            return
+        if self.redis is None:
+            self._set_l1(key, value, ttl)
+            return
+
+        raw = json.dumps(value, ensure_ascii=False)
+        try:
+            if version is None:
+                await self.redis.set(self._redis_key(key), raw, ex=ttl)
+            else:
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    version_key = self._version_key(key)
+                    await pipe.watch(version_key)
+                    if int(await pipe.get(version_key) or 0) != version[1]:
+                        return
+                    pipe.multi()
+                    pipe.set(self._redis_key(key), raw, ex=ttl)
+                    await pipe.execute()
+        except WatchError:
+            # Ключ инвалидировали во время записи
+            return
+        except Exception as e:
+            logger.warning("[Кеш] Ошибка записи %s в Redis: %s", key, e)
+        self._set_l1(key, value, ttl)
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Удаляет ключи из кеша на всех репликах.
+        :param keys: Ключи
+        """
+        self._drop_local(keys)
+        if self.redis is None or not keys:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(*(self._redis_key(key) for key in keys))
+                for key in keys:
+                    pipe.incr(self._version_key(key))
+                    pipe.expire(self._version_key(key), VERSION_TTL)
+                await pipe.execute()
+            await self.redis.publish(self.channel, json.dumps(list(keys)))
+        except Exception as e:
+            logger.warning("[Кеш] Ошибка инвалидации %s: %s", keys, e)
+
+    async def close(self) -> None:
+        """Останавливает подписку на инвалидации."""
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+def user_key(chat_id: int) -> str:
+    """Ключ кеша пользователя по его Telegram ID."""
+    return f"users:{chat_id}"
+
+
+def active_question_key(chat_id: int) -> str:
+    """Ключ кеша активного вопроса специалиста по его Telegram ID."""
+    return f"active_question:{chat_id}"
+
+
+cache = SharedCache()
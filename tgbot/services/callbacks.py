@@ -0,0 +1,216 @@
+import logging
+import re
+import types
+import typing
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from aiogram.filters.callback_data import CallbackData
+from pydantic.fields import FieldInfo
+
+from tgbot.keyboards.admin.main import AdminMenu, ChangeRole
+from tgbot.keyboards.admin.stats_extract import (
+    DivisionStatsExtract,
+    MonthStatsExtract,
+    SlaStats,
+)
+from tgbot.keyboards.group.events import RemovedUser
+from tgbot.keyboards.group.main import (
+    FinishedQuestion,
+    QuestionAllowReturn,
+    QuestionQualityDuty,
+)
+from tgbot.keyboards.user.main import (
+    ActivityStatusToggle,
+    AskQuestionMenu,
+    CancelQuestion,
+    MainMenu,
+    QuestionQualitySpecialist,
+    ReturnQuestion,
+    ReturnQuestionsPage,
+)
+
+logger = logging.getLogger(__name__)
+
+# Кол-во разных строк callback_data, для которых хранится разобранный объект
+DECODE_CACHE_SIZE = 4096
+
+_UNION_TYPES = {typing.Union, types.UnionType}
+
+_INT_RE = re.compile(r"-?[0-9]+")
+
+
+class _NotFast(ValueError):
+    """Значение не в том виде, в котором его кодирует pack(): решает CallbackData.unpack."""
+
+
+def _decode_int(value: str) -> int:
+    # int() принимает и то, что pydantic отвергает (пробелы, "1_000"), поэтому только цифры
+    if not _INT_RE.fullmatch(value):
+        raise _NotFast(value)
+    return int(value)
+
+
+def _decode_bool(value: str) -> bool:
+    # pack() кодирует bool как "1"/"0", остальные написания проверяет pydantic
+    if value == "1":
+        return True
+    if value == "0":
+        return False
+    raise _NotFast(value)
+
+
+def _decode_literal(value: str, allowed: tuple[str, ...]) -> str:
+    if value not in allowed:
+        raise _NotFast(value)
+    return value
+
+
+def _field_converter(field: FieldInfo) -> Optional[Callable[[str], Any]]:
+    """
+    Подбирает функцию разбора строкового значения поля.
+    :return: Функция разбора или None, если тип поля быстрым путем не разбирается
+    """
+    annotation = field.annotation
+    if field.metadata:
+        # Ограничения поля (длина, диапазон) проверяет только pydantic
+        return None
+    if typing.get_origin(annotation) is typing.Literal:
+        allowed = typing.get_args(annotation)
+        if not all(isinstance(value, str) for value in allowed):
+            return None
+        return lambda value: _decode_literal(value, allowed)
+    if typing.get_origin(annotation) in _UNION_TYPES:
+        args = set(typing.get_args(annotation)) - {type(None)}
+        # int | str pydantic оставляет строкой, если пришла строка
+        if str in args:
+            return str
+        if len(args) != 1:
+            return None
+        (annotation,) = args
+
+    if annotation is str:
+        return str
+    if annotation is bool:
+        return _decode_bool
+    if annotation is int:
+        return _decode_int
+    return None
+
+
+class CallbackDecoder:
+    """
+    Разбор callback_data одного класса без валидации pydantic.
+
+    Конвертеры полей вычисляются один раз при регистрации, а объект создается через
+    model_construct. Быстрый путь принимает только значения в том виде, в котором их
+    кодирует pack(). Во всех остальных случаях — тип поля быстрым путем не разбирается,
+    у класса есть валидаторы, значение пустое или записано иначе — используется
+    CallbackData.unpack, поэтому результат всегда совпадает с ним.
+    """
+
+    def __init__(self, callback_cls: type[CallbackData]) -> None:
+        self.callback_cls = callback_cls
+        self.prefix = callback_cls.__prefix__
+        self.separator = callback_cls.__separator__
+        self.fields = []
+        decorators = callback_cls.__pydantic_decorators__
+        self.fast = not (decorators.field_validators or decorators.model_validators)
+
+        for name, field in callback_cls.model_fields.items():
+            converter = _field_converter(field)
+            if converter is None:
+                self.fast = False
+            self.fields.append((name, converter))
+
+    def decode(self, data: str) -> CallbackData:
+        """
+        Разбирает строку callback_data.
+        :raises ValueError: Строка не соответствует формату класса
+        """
+        if not self.fast:
+            return self.callback_cls.unpack(data)
+
+        parts = data.split(self.separator)
+        if len(parts) != len(self.fields) + 1:
+            raise ValueError(
+                f"{self.callback_cls.__name__} ожидает {len(self.fields)} значений"
+            )
+
+        values = {}
+        try:
+            for (name, converter), value in zip(self.fields, parts[1:]):
+                if value == "":
+                    # Значение по умолчанию вместо пустого pydantic еще должен проверить
+                    raise _NotFast(value)
+                values[name] = converter(value)
+        except _NotFast:
+            return self.callback_cls.unpack(data)
+        return self.callback_cls.model_construct(**values)
+
+
+_decoders: dict[str, CallbackDecoder] = {}
+
+
+def register_callback(callback_cls: type[CallbackData]) -> type[CallbackData]:
+    """
+    Регистрирует класс callback_data в таблице быстрого разбора по префиксу.
+    Можно использовать как декоратор класса.
+    """
+    prefix = callback_cls.__prefix__
+    registered = _decoders.get(prefix)
+    if registered is not None and registered.callback_cls is not callback_cls:
+        raise ValueError(
+            f"Префикс {prefix!r} уже занят классом {registered.callback_cls.__name__}"
+        )
+    _decoders[prefix] = CallbackDecoder(callback_cls)
+    _decode_cached.cache_clear()
+    return callback_cls
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_cached(data: str) -> Optional[CallbackData]:
+    prefix = data.split(":", 1)[0]
+    decoder = _decoders.get(prefix)
+    if decoder is None:
+        return None
+
+    try:
+        return decoder.decode(data)
+    except (TypeError, ValueError) as e:
+        logger.debug("[Callback] Не удалось разобрать %r: %s", data, e)
+        return None
+
+
+def decode_callback(data: str) -> Optional[CallbackData]:
+    """
+    Разбирает callback_data любого зарегистрированного класса: префикс ищется в словаре,
+    значения разбираются без валидации pydantic.
+    Разбор кешируется по строке, но каждый вызов получает свою копию объекта: CallbackData
+    изменяемый, и правка в одном хендлере не должна попасть в другие апдейты.
+    :param data: Строка callback_data из CallbackQuery
+    :return: Объект callback_data или None, если строка не разбирается
+    """
+    decoded = _decode_cached(data)
+    return decoded.model_copy() if decoded is not None else None
+
+
+for _callback_cls in (
+    MainMenu,
+    AskQuestionMenu,
+    QuestionQualitySpecialist,
+    ReturnQuestion,
+    ReturnQuestionsPage,
+    CancelQuestion,
+    ActivityStatusToggle,
+    QuestionQualityDuty,
+    QuestionAllowReturn,
+    FinishedQuestion,
+    RemovedUser,
+    AdminMenu,
+    ChangeRole,
+    MonthStatsExtract,
+    DivisionStatsExtract,
+    SlaStats,
+):
+    register_callback(_callback_cls)
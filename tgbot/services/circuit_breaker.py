@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.exc import (
+    DBAPIError,
+    DisconnectionError,
+    InterfaceError,
+    OperationalError,
+)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Ошибки, среди которых бывают временные: обрыв связи, таймаут, занятое соединение
+RETRYABLE_ERRORS = (DBAPIError, DisconnectionError, PoolTimeoutError, TimeoutError)
+
+
+class CircuitOpenError(Exception):
+    """Запрос не выполнялся: предохранитель БД разомкнут."""
+
+
+def is_transient_db_error(error: Exception) -> bool:
+    """
+    Временная ли ошибка БД: обрыв или недоступность соединения, таймаут.
+    Ошибки в самом запросе (синтаксис, ограничения, данные) временными не считаются
+    и на предохранитель не влияют.
+    """
+    if isinstance(
+        error,
+        (
+            DisconnectionError,
+            OperationalError,
+            InterfaceError,
+            PoolTimeoutError,
+            TimeoutError,
+        ),
+    ):
+        return True
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or "Connection is busy" in str(error)
+    return False
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для запросов к одной базе данных.
+
+    Временные ошибки повторяются с экспоненциальной задержкой и случайным разбросом.
+    После failure_threshold ошибок подряд предохранитель размыкается: запросы сразу получают
+    CircuitOpenError и не нагружают сервер. Через reset_timeout секунд пропускается один пробный
+    запрос — при успехе предохранитель замыкается.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        max_retries: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        """Состояние предохранителя: closed, open или half_open."""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    @property
+    def is_open(self) -> bool:
+        """Нужно ли сейчас отказывать в запросах к БД."""
+        state = self.state
+        return state == "open" or (state == "half_open" and self._trial_running)
+
+    def record_success(self) -> None:
+        was_open = self._opened_at is not None
+        self._failures = 0
+        self._opened_at = None
+        if was_open:
+            logger.info("[БД %s] Предохранитель замкнут, БД снова доступна", self.name)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.error(
+                    "[БД %s] Предохранитель разомкнут после %s ошибок подряд",
+                    self.name,
+                    self._failures,
+                )
+            self._opened_at = time.monotonic()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.base_delay * (2**attempt), self.max_delay)
+        return random.uniform(delay / 2, delay)
+
+    async def call(
+        self, func: Callable[[], Awaitable[T]], retry: bool = True
+    ) -> T:
+        """
+        Выполняет запрос к БД через предохранитель.
+        :param func: Функция без аргументов, возвращающая корутину запроса
+        :param retry: Повторять ли func при временной ошибке. Отключается, если у func
+            есть побочные эффекты помимо запроса (например, это целый хендлер)
+        :return: Результат запроса
+        :raises CircuitOpenError: Предохранитель разомкнут
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_running):
+            raise CircuitOpenError(self.name)
+
+        trial = state == "half_open"
+        if trial:
+            self._trial_running = True
+
+        try:
+            attempts = self.max_retries if retry else 1
+            for attempt in range(attempts):
+                try:
+                    result = await func()
+                except RETRYABLE_ERRORS as e:
+                    if not is_transient_db_error(e):
+                        raise
+                    self.record_failure()
+                    if trial or self.is_open or attempt == attempts - 1:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(
+                        "[БД %s] Временная ошибка, повтор %s/%s через %.2f с: %s",
+                        self.name,
+                        attempt + 1,
+                        self.max_retries,
+                        delay,
+                        e,
+                    )
+                    await asyncio.sleep(delay)
+                else:
+                    self.record_success()
+                    return result
+        finally:
+            if trial:
+                self._trial_running = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Возвращает общий для процесса предохранитель базы данных по ее имени."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def watch_engine(engine, breaker: CircuitBreaker) -> None:
+    """
+    Подключает предохранитель к движку БД: каждый выполненный запрос замыкает его,
+    каждая временная ошибка соединения учитывается как сбой. Так предохранитель видит
+    только запросы к своей БД, даже если они выполняются внутри хендлера.
+    :param engine: Движок БД (AsyncEngine или Engine)
+    :param breaker: Предохранитель этой БД
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    def on_error(context) -> None:
+        error = context.sqlalchemy_exception or context.original_exception
+        if context.is_disconnect or is_transient_db_error(error):
+            breaker.record_failure()
+
+    def on_success(*args) -> None:
+        breaker.record_success()
+
+    event.listen(sync_engine, "handle_error", on_error)
+    event.listen(sync_engine, "after_cursor_execute", on_success)
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingEdit:
+    """
+    Правка, ожидающая отправки.
+
+    Attributes:
+        message: Последняя версия отредактированного сообщения.
+        target_chat_id: Чат зеркального сообщения.
+        target_message_id: Идентификатор зеркального сообщения.
+        target_thread_id: Топик зеркального сообщения (для форумов).
+        direction: 'user_to_topic' или 'topic_to_user'.
+        version: Номер версии, растет с каждой новой правкой.
+    """
+
+    message: Message
+    target_chat_id: int
+    target_message_id: int
+    target_thread_id: Optional[int]
+    direction: Optional[str]
+    version: int = 0
+
+
+class EditCoalescer:
+    """
+    Склеивает серии правок одного сообщения в один вызов Bot API.
+
+    Правки ключуются по (chat_id, message_id) исходного сообщения. Пока правка ждет отправки,
+    новые правки того же сообщения только заменяют ее содержимое, а зеркальное сообщение
+    берется из уже найденной цели — без повторного запроса в БД.
+    При TelegramRetryAfter отправка повторяется с экспоненциальной задержкой, и уходит
+    всегда самая свежая версия правки.
+    """
+
+    def __init__(self, bot: Bot, window: float = 1.0, max_retries: int = 5) -> None:
+        self.bot = bot
+        self.window = window
+        self.max_retries = max_retries
+        self._pending: dict[tuple[int, int], PendingEdit] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def get_pending(self, chat_id: int, message_id: int) -> Optional[PendingEdit]:
+        """Возвращает ожидающую правку сообщения, если она есть."""
+        return self._pending.get((chat_id, message_id))
+
+    def submit(
+        self,
+        message: Message,
+        target_chat_id: int,
+        target_message_id: int,
+        target_thread_id: Optional[int] = None,
+        direction: Optional[str] = None,
+    ) -> None:
+        """
+        Ставит правку в очередь. Если правка этого сообщения уже ждет отправки — заменяет ее.
+        :param message: Отредактированное сообщение
+        :param target_chat_id: Чат зеркального сообщения
+        :param target_message_id: Идентификатор зеркального сообщения
+        :param target_thread_id: Топик зеркального сообщения
+        :param direction: Направление правки
+        """
+        key = (message.chat.id, message.message_id)
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.message = message
+            pending.version += 1
+            return
+
+        self._pending[key] = PendingEdit(
+            message=message,
+            target_chat_id=target_chat_id,
+            target_message_id=target_message_id,
+            target_thread_id=target_thread_id,
+            direction=direction,
+        )
+        task = asyncio.create_task(self._flush_later(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, key: tuple[int, int]) -> None:
+        await asyncio.sleep(self.window)
+        await self._flush(key)
+
+    async def _flush(self, key: tuple[int, int]) -> None:
+        pending = self._pending.get(key)
+        if pending is None:
+            return
+
+        try:
+            attempt = 0
+            applied_version = -1
+            while applied_version != pending.version and attempt < self.max_retries:
+                version = pending.version
+                try:
+                    await self._apply(pending)
+                    applied_version = version
+                except TelegramRetryAfter as e:
+                    attempt += 1
+                    delay = e.retry_after * (2 ** (attempt - 1)) + random.uniform(0, 1)
+                    logger.warning(
+                        "[Редактирование] Флуд-лимит для %s:%s, повтор через %.1f с",
+                        pending.target_chat_id,
+                        pending.target_message_id,
+                        delay,
+                    )
+                    await asyncio.sleep(delay)
+
+            if applied_version != pending.version:
+                logger.error(
+                    "[Редактирование] Не удалось отредактировать %s:%s за %s попыток",
+                    pending.target_chat_id,
+                    pending.target_message_id,
+                    self.max_retries,
+                )
+        except Exception as e:
+            logger.error(
+                "[Редактирование] Ошибка при редактировании %s:%s: %s",
+                pending.target_chat_id,
+                pending.target_message_id,
+                e,
+            )
+        finally:
+            self._pending.pop(key, None)
+
+    async def _apply(self, pending: PendingEdit) -> None:
+        message = pending.message
+        try:
+            if message.text is not None:
+                await self.bot.edit_message_text(
+                    chat_id=pending.target_chat_id,
+                    message_id=pending.target_message_id,
+                    text=message.text,
+                    entities=message.entities,
+                    parse_mode=None,
+                )
+            else:
+                await self.bot.edit_message_caption(
+                    chat_id=pending.target_chat_id,
+                    message_id=pending.target_message_id,
+                    caption=message.caption,
+                    caption_entities=message.caption_entities,
+                    parse_mode=None,
+                )
+        except TelegramBadRequest as e:
+            # Содержимое уже совпадает — правка по сути применена
+            if "message is not modified" not in str(e):
+                raise
+
+    async def close(self) -> None:
+        """Отправляет все ожидающие правки без ожидания окна. Используется при остановке бота."""
+        await asyncio.gather(*(self._flush(key) for key in list(self._pending)))
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from infrastructure.database.repo.events import QuestionEventsRepo
+from tgbot.services.circuit_breaker import is_transient_db_error
+
+logger = logging.getLogger(__name__)
+
+# Типы событий вопроса
+QUESTION_EVENTS = ("opened", "taken", "released", "message", "closed", "returned", "rated")
+
+
+class EventWriter:
+    """
+    Буферизованная запись событий вопросов в question_events.
+
+    emit() только кладет событие в буфер и не ждет БД. Буфер записывается одной транзакцией
+    (события и агрегаты по дням) раз в interval секунд или сразу при накоплении batch_size событий.
+    Если БД недоступна, события остаются в буфере до следующей попытки; сверх max_buffered
+    самые старые события отбрасываются. Пачка, которую БД отвергает по другой причине,
+    делится пополам, пока не останутся отдельные события: они отбрасываются с записью в лог,
+    а остальные записываются. При остановке бота буфер дописывается.
+    """
+
+    def __init__(
+        self, interval: float = 2.0, batch_size: int = 200, max_buffered: int = 20000
+    ) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self.session_pool = None
+        self._buffer: list[dict] = []
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def setup(self, session_pool) -> None:
+        """
+        Запускает фоновую запись событий.
+        :param session_pool: Пул сессий БД вопросника
+        """
+        self.session_pool = session_pool
+        self._flusher = asyncio.create_task(self._run())
+
+    def emit(
+        self,
+        question_token: str,
+        event: str,
+        actor: Optional[str] = None,
+        division: Optional[str] = None,
+        value: Optional[str] = None,
+        occurred_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Добавляет событие вопроса в буфер записи.
+        :param question_token: Токен вопроса
+        :param event: Тип события из QUESTION_EVENTS
+        :param actor: ФИО участника
+        :param division: Направление специалиста
+        :param value: Данные события
+        :param occurred_at: Время события (по умолчанию — текущее)
+        """
+        self._buffer.append(
+            {
+                "question_token": question_token,
+                "event": event,
+                "occurred_at": occurred_at or datetime.now(),
+                "actor": actor,
+                "division": division,
+                "value": value,
+            }
+        )
+        if len(self._buffer) > self.max_buffered:
+            dropped = len(self._buffer) - self.max_buffered
+            del self._buffer[:dropped]
+            logger.warning("[События] Буфер переполнен, отброшено событий: %s", dropped)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Записывает накопленные события."""
+        if not self._buffer or self.session_pool is None:
+            return
+
+        events, self._buffer = self._buffer, []
+        failed = await self._write(events)
+        if failed:
+            # Возвращаем события в начало буфера, чтобы сохранить порядок
+            self._buffer[:0] = failed[-self.max_buffered :]
+
+    async def _write(self, events: list[dict]) -> list[dict]:
+        """
+        Записывает события.
+        :return: События, не записанные из-за временной ошибки БД, — их нужно повторить
+        """
+        try:
+            async with self.session_pool() as session:
+                await QuestionEventsRepo(session).write_events(events)
+            return []
+        except Exception as e:
+            if is_transient_db_error(e):
+                logger.error(
+                    "[События] Не удалось записать %s событий, повтор позже: %s",
+                    len(events),
+                    e,
+                )
+                return events
+            if len(events) == 1:
+                logger.error("[События] Событие отброшено: %s (%s)", events[0], e)
+                return []
+
+        # Ищем события, которые отвергает БД, чтобы не потерять остальные
+        middle = len(events) // 2
+        failed = await self._write(events[:middle])
+        if failed:
+            return failed + events[middle:]
+        return await self._write(events[middle:])
+
+    async def close(self) -> None:
+        """Останавливает фоновую запись и дописывает буфер. Используется при остановке бота."""
+        self._closing = True
+        if self._flusher is not None:
+            # Текущая запись не прерывается: цикл завершается после нее
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+
+
+event_writer = EventWriter()
@@ -1,29 +1,38 @@
+import asyncio
 import logging
+from typing import Optional
 
 import aiohttp
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
 
-from tgbot.config import load_config
-from tgbot.services.logger import setup_logging
+from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.config import get_config
 
-config = load_config(".env")
-
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
-async def is_employee_intern(
-    username: str,
-) -> bool:
-    try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+def _get_access_token() -> str:
+    # google-auth тянет за собой много модулей, импортируем его только при первом запросе
+    from google.auth.transport.requests import Request
+    from google.oauth2 import service_account
 
-        creds = service_account.Credentials.from_service_account_file(
-            "./service_account.json", scopes=scopes
-        )
-        creds.refresh(Request())
-        access_token = creds.token
+    scopes = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+
+    creds = service_account.Credentials.from_service_account_file(
+        "./service_account.json", scopes=scopes
+    )
+    creds.refresh(Request())
+    return creds.token
+
+
+async def fetch_interns() -> Optional[set[str]]:
+    """
+    Получает список стажеров из таблицы ОР.
+    :return: Никнеймы стажеров без @ в нижнем регистре или None, если таблицу получить не удалось
+    """
+    config = get_config()
+    try:
+        # Обновление токена — синхронный HTTP-запрос, не блокируем им цикл событий
+        access_token = await asyncio.to_thread(_get_access_token)
 
         range_query = f"{config.tg_bot.interns_sheet_name}!A:A"
         url = f"https://sheets.googleapis.com/v4/spreadsheets/{config.tg_bot.interns_spreadsheet_id}/values/{range_query}"
@@ -33,48 +42,119 @@ async def is_employee_intern(
             async with session.get(url, headers=headers) as resp:
                 if resp.status != 200:
                     logger.error(
-                        "[Проверка ОР] Не удалось открыть таблицу:", await resp.text()
+                        "[Проверка ОР] Не удалось открыть таблицу: %s", await resp.text()
                     )
-                    return False
+                    return None
                 data = await resp.json()
 
-        values = data.get("values", [])
-        for row in values:
-            if row and row[0].strip() == f"@{username}":
-                return True
+    except Exception as e:
+        logger.error("[Проверка ОР] Не удалось получить список стажеров: %s", e)
+        return None
 
-        return False
+    # В таблице никнеймы записаны с "@", сравниваются точно, как записаны
+    return {row[0].strip() for row in data.get("values", []) if row and row[0].strip()}
 
-    except Exception as e:
-        print(f"Error: {e}")
-        return False
+
+async def is_employee_intern(
+    username: str,
+) -> bool:
+    interns = await fetch_interns()
+    return bool(interns) and f"@{username}" in interns
+
+
+class ForumRouting:
+    """
+    Таблица маршрутизации вопросов по форумам.
+
+    Форум для пары (никнейм, направление) вычисляется заранее для всех пользователей
+    из RegisteredUsers и списка стажеров ОР и обновляется по расписанию, поэтому выбор форума
+    при вопросе — поиск в словаре без запросов к Google Sheets.
+    Направления и форумы берутся из конфига (division_forums, intern_forums).
+    """
+
+    def __init__(self) -> None:
+        self.interns: set[str] = set()
+        self._routes: dict[tuple[str, str], int | str] = {}
+        # Направление из БД -> ключ division_forums (None — направление неизвестно)
+        self._divisions: dict[str, Optional[str]] = {}
+        # Пока список стажеров ни разу не загружен, маршруты не запоминаются
+        self._interns_loaded = False
+
+    def _division_key(self, division: str) -> Optional[str]:
+        if division in self._divisions:
+            return self._divisions[division]
+
+        forums = get_config().tg_bot.division_forums
+        normalized = (division or "").strip().upper()
+        key = next((k for k in forums if k.upper() == normalized), None)
+        if key is None:
+            logger.warning(
+                "[Маршрутизация] Неизвестное направление %r, вопросы уйдут в форум НТП",
+                division,
+            )
+
+        self._divisions[division] = key
+        return key
+
+    def _compute(self, username: str, division: str) -> int | str:
+        tg_bot = get_config().tg_bot
+        key = self._division_key(division)
+        if key is None:
+            return tg_bot.ntp_forum_id
+
+        intern_forum = tg_bot.intern_forums.get(key)
+        if intern_forum and f"@{username}" in self.interns:
+            return intern_forum
+        return tg_bot.division_forums[key]
+
+    def route(self, username: str, division: str) -> int | str:
+        """
+        Возвращает форум для вопроса пользователя.
+        :param username: Никнейм пользователя Telegram
+        :param division: Направление пользователя
+        """
+        route_key = (username, division)
+        forum_id = self._routes.get(route_key)
+        if forum_id is None:
+            forum_id = self._compute(*route_key)
+            if self._interns_loaded:
+                self._routes[route_key] = forum_id
+        return forum_id
+
+    async def refresh(self, main_session_pool) -> None:
+        """Перестраивает таблицу по списку стажеров и направлениям из RegisteredUsers."""
+        interns = await fetch_interns()
+        if interns is not None:
+            self.interns = interns
+            self._interns_loaded = True
+        else:
+            logger.warning(
+                "[Маршрутизация] Используется предыдущий список стажеров (%s)",
+                len(self.interns),
+            )
+
+        async with main_session_pool() as session:
+            users = await RequestsRepo(session).users.get_usernames_with_divisions()
+
+        # Конфиг мог быть перечитан, поэтому направления разбираются заново
+        self._divisions = {}
+        routes = {}
+        for username, division in users:
+            routes[(username, division)] = self._compute(username, division)
+        self._routes = routes
+
+        logger.info(
+            "[Маршрутизация] Таблица обновлена: %s пользователей, %s стажеров",
+            len(routes),
+            len(self.interns),
+        )
+
+
+forum_routing = ForumRouting()
 
 
 async def get_target_forum(
     username: str,
     division: str,
 ) -> int | str:
-    if division == "НЦК":
-        try:
-            # Проверяем, является ли пользователь стажёром
-            is_intern = await is_employee_intern(username=username)
-
-            if is_intern:
-                # Если стажёр - используем специальный форум для стажёров
-                target_forum_id = config.tg_bot.nck_or_forum_id
-                logger.info(f"[Проверка ОР] Определен стажер: {username}")
-            else:
-                # Если не стажёр - используем обычный НЦК форум
-                target_forum_id = config.tg_bot.nck_forum_id
-
-        except Exception as e:
-            # В случае ошибки при проверке стажёра, отправляем в основной НЦК форум
-            logging.error(
-                f"Ошибка при проверке стажёра для пользователя {username}: {e}"
-            )
-            target_forum_id = config.tg_bot.nck_forum_id
-    else:
-        # Для НТП используем соответствующий форум
-        target_forum_id = config.tg_bot.ntp_forum_id
-
-    return target_forum_id
+    return forum_routing.route(username, division)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LifecycleManager:
+    """
+    Координирует остановку бота.
+
+    Поллинг останавливает сам aiogram (по SIGINT/SIGTERM), после чего вызывается shutdown():
+    ждем завершения обрабатываемых апдейтов, затем по очереди выполняем зарегистрированные шаги
+    (сброс буферов, остановка планировщика, закрытие пулов БД). Все укладывается в общий дедлайн,
+    шаг, не успевший за отведенное время, прерывается, и остановка продолжается.
+    """
+
+    def __init__(self, deadline: float = 25) -> None:
+        self.deadline = deadline
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._steps: list[tuple[str, Callable[[], Awaitable]]] = []
+        self._stopped = False
+
+    @property
+    def in_flight(self) -> int:
+        """Кол-во апдейтов, обрабатываемых прямо сейчас."""
+        return self._in_flight
+
+    def update_started(self) -> None:
+        self._in_flight += 1
+        self._idle.clear()
+
+    def update_finished(self) -> None:
+        self._in_flight -= 1
+        if self._in_flight <= 0:
+            self._in_flight = 0
+            self._idle.set()
+
+    def on_shutdown(self, name: str, callback: Callable[[], Awaitable]) -> None:
+        """
+        Регистрирует шаг остановки. Шаги выполняются в порядке регистрации.
+        :param name: Название шага для логов
+        :param callback: Функция без аргументов, возвращающая awaitable
+        """
+        self._steps.append((name, callback))
+
+    async def shutdown(self, **_) -> None:
+        """Останавливает бота в пределах дедлайна. Повторные вызовы ничего не делают."""
+        if self._stopped:
+            return
+        self._stopped = True
+
+        started = time.monotonic()
+
+        def remaining() -> float:
+            return max(self.deadline - (time.monotonic() - started), 0.1)
+
+        if self._in_flight:
+            logger.info(
+                "[Остановка] Ожидаем завершения %s обрабатываемых апдейтов",
+                self._in_flight,
+            )
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=remaining())
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "[Остановка] Не дождались %s апдейтов, продолжаем остановку",
+                    self._in_flight,
+                )
+
+        for name, callback in self._steps:
+            try:
+                await asyncio.wait_for(callback(), timeout=remaining())
+                logger.info("[Остановка] %s: готово", name)
+            except asyncio.TimeoutError:
+                logger.warning("[Остановка] %s: превышен дедлайн", name)
+            except Exception as e:
+                logger.error("[Остановка] %s: ошибка %s", name, e)
+
+        logger.info(
+            "[Остановка] Бот остановлен за %.1f с", time.monotonic() - started
+        )
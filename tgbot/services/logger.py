@@ -1,13 +1,77 @@
+import atexit
+import json
 import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
 import betterlogging as bl
 
+LOG_FORMAT = "%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s"
 
-def setup_logging():
-    log_level = logging.INFO
-    bl.basic_colorized_config(level=log_level)
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
 
-    logging.basicConfig(
-        level=log_level,
-        format="%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s",
-    )
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует записи лога в одну JSON-строку для сборщиков логов."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def setup_logging(json_format: bool = False, level: int = logging.INFO):
+    """
+    Однократная настройка логирования для всего процесса.
+
+    Корневой логгер пишет записи в очередь через QueueHandler, а вывод в поток
+    выполняет QueueListener в отдельном потоке, поэтому запись лога не блокирует event loop.
+    Повторные вызовы ничего не делают.
+
+    :param json_format: Выводить логи в формате JSON вместо цветного текста
+    :param level: Уровень логирования
+    """
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler()
+        if json_format:
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(bl.ColorizedFormatter(LOG_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.handlers.clear()
+        root.addHandler(QueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = QueueListener(
+            log_queue, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Останавливает фоновый поток логирования, дописав накопленные записи."""
+    global _listener
+
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import ChatMemberUpdated
+
+from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.config import Config
+from tgbot.services.permissions import Capability, capabilities_for_role
+from tgbot.services.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+MEMBERS_PATH = Path("cache/forum_members.json")
+
+# Статусы, при которых пользователь находится в чате
+PRESENT_STATUSES = {"creator", "administrator", "member", "restricted"}
+
+
+def forum_ids(config: Config) -> list[int]:
+    """Идентификаторы форумов с вопросами без повторов."""
+    ids = []
+    for forum_id in (
+        *config.tg_bot.division_forums.values(),
+        *config.tg_bot.intern_forums.values(),
+    ):
+        if forum_id and int(forum_id) not in ids:
+            ids.append(int(forum_id))
+    return ids
+
+
+class MembershipTracker:
+    """
+    Состав форумов по событиям chat_member.
+
+    Bot API не отдает полный список участников группы, поэтому участники собираются
+    из событий входа и выхода. Пользователи, заблокированные сверкой, запоминаются отдельно,
+    чтобы разблокировать их, когда у них появятся права.
+    Состояние сохраняется в cache/ и переживает перезапуск бота.
+    """
+
+    def __init__(self, path: Path = MEMBERS_PATH) -> None:
+        self.path = path
+        self.members: dict[int, set[int]] = {}
+        self.banned: dict[int, set[int]] = {}
+
+    def observe(self, event: ChatMemberUpdated) -> None:
+        """Учитывает событие изменения участника чата."""
+        user = event.new_chat_member.user
+        if user.is_bot:
+            return
+
+        members = self.members.setdefault(event.chat.id, set())
+        if event.new_chat_member.status in PRESENT_STATUSES:
+            members.add(user.id)
+            self.banned.get(event.chat.id, set()).discard(user.id)
+        else:
+            members.discard(user.id)
+
+    def load(self) -> None:
+        try:
+            state = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error("[Сверка участников] Не удалось прочитать состав форумов: %s", e)
+            return
+
+        self.members = {int(k): set(v) for k, v in state.get("members", {}).items()}
+        self.banned = {int(k): set(v) for k, v in state.get("banned", {}).items()}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps(
+                {
+                    "members": {k: sorted(v) for k, v in self.members.items()},
+                    "banned": {k: sorted(v) for k, v in self.banned.items()},
+                }
+            )
+        )
+
+    async def close(self) -> None:
+        """Сохраняет состав форумов. Используется при остановке бота."""
+        self.save()
+
+
+@dataclass
+class ModerationAction:
+    action: Literal["ban", "unban"]
+    chat_id: int
+    user_id: int
+
+
+class ModerationQueue:
+    """
+    Очередь блокировок и разблокировок с ограничением частоты вызовов Bot API.
+    Действия выполняются одним фоновым обработчиком, при флуд-лимите — повторяются.
+    """
+
+    def __init__(self, bot: Bot, rate: float = 5) -> None:
+        self.bot = bot
+        self.limiter = AsyncRateLimiter(rate=rate)
+        self._queue: asyncio.Queue[ModerationAction] = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    def put(self, action: ModerationAction) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+        self._queue.put_nowait(action)
+
+    async def _work(self) -> None:
+        while True:
+            action = await self._queue.get()
+            try:
+                await self._apply(action)
+            finally:
+                self._queue.task_done()
+
+    async def _apply(self, action: ModerationAction) -> None:
+        for _ in range(3):
+            await self.limiter.acquire()
+            try:
+                if action.action == "ban":
+                    await self.bot.ban_chat_member(
+                        chat_id=action.chat_id, user_id=action.user_id
+                    )
+                else:
+                    await self.bot.unban_chat_member(
+                        chat_id=action.chat_id,
+                        user_id=action.user_id,
+                        only_if_banned=True,
+                    )
+                return
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                logger.warning(
+                    "[Сверка участников] Не удалось выполнить %s для %s в %s: %s",
+                    action.action,
+                    action.user_id,
+                    action.chat_id,
+                    e,
+                )
+                return
+            except Exception as e:
+                logger.error(
+                    "[Сверка участников] Ошибка %s для %s в %s: %s",
+                    action.action,
+                    action.user_id,
+                    action.chat_id,
+                    e,
+                )
+                return
+
+    async def close(self) -> None:
+        """Дожидается выполнения поставленных действий. Используется при остановке бота."""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+
+async def reconcile_memberships(
+    bot: Bot,
+    config: Config,
+    main_session_pool,
+    tracker: MembershipTracker,
+    queue: ModerationQueue,
+) -> None:
+    """
+    Сверяет участников форумов с RegisteredUsers одним запросом и ставит в очередь
+    блокировку тех, у кого нет прав на форум, и разблокировку тех, у кого права появились.
+    Администраторы чатов не блокируются — о них только пишется в лог.
+    """
+    admins: dict[int, set[int]] = {}
+    for chat_id in forum_ids(config):
+        try:
+            chat_admins = await bot.get_chat_administrators(chat_id=chat_id)
+        except Exception as e:
+            logger.error(
+                "[Сверка участников] Не удалось получить администраторов %s: %s",
+                chat_id,
+                e,
+            )
+            continue
+        admins[chat_id] = {
+            member.user.id for member in chat_admins if not member.user.is_bot
+        }
+
+    user_ids = set().union(
+        *admins.values(),
+        *(tracker.members.get(chat_id, set()) for chat_id in admins),
+        *(tracker.banned.get(chat_id, set()) for chat_id in admins),
+    )
+    if not user_ids:
+        return
+
+    async with main_session_pool() as session:
+        users = await RequestsRepo(session).users.get_users_by_chat_ids(user_ids)
+    allowed = {
+        user.ChatId
+        for user in users
+        if capabilities_for_role(user.Role) & Capability.FORUM_ACCESS
+    }
+
+    bans = unbans = 0
+    for chat_id, chat_admins in admins.items():
+        for user_id in chat_admins - allowed:
+            logger.warning(
+                "[Сверка участников] Администратор %s в %s без прав на форум",
+                user_id,
+                chat_id,
+            )
+
+        banned = tracker.banned.setdefault(chat_id, set())
+        members = tracker.members.setdefault(chat_id, set())
+
+        for user_id in members - chat_admins - allowed:
+            queue.put(ModerationAction("ban", chat_id, user_id))
+            members.discard(user_id)
+            banned.add(user_id)
+            bans += 1
+
+        for user_id in banned & allowed:
+            queue.put(ModerationAction("unban", chat_id, user_id))
+            banned.discard(user_id)
+            unbans += 1
+
+    tracker.save()
+    logger.info(
+        "[Сверка участников] Проверено %s пользователей: блокировок %s, разблокировок %s",
+        len(user_ids),
+        bans,
+        unbans,
+    )
@@ -0,0 +1,57 @@
+from enum import IntFlag
+from typing import Optional
+
+from tgbot.misc.dicts import executed_codes, role_names
+
+
+class Capability(IntFlag):
+    """Права пользователя в боте. Роль из БД раскладывается в набор прав один раз при импорте."""
+
+    NONE = 0
+    # Задавать вопросы через бота
+    ASK = 1
+    # Находиться в форуме с вопросами
+    FORUM_ACCESS = 2
+    # Освобождать вопросы (/release)
+    RELEASE_QUESTION = 4
+    # Админ-меню, выгрузка статистики, смена роли
+    ADMIN = 8
+
+
+# Права по названиям ролей из role_names / executed_codes
+_ROLE_CAPABILITIES = {
+    "Руководитель группы": Capability.FORUM_ACCESS,
+    "Старший": Capability.FORUM_ACCESS | Capability.RELEASE_QUESTION,
+    "root": Capability.FORUM_ACCESS | Capability.RELEASE_QUESTION | Capability.ADMIN,
+}
+
+
+def _build_role_masks() -> tuple[Capability, ...]:
+    masks = [Capability.ASK] * len(role_names)
+    # Роль 0 — пользователь без определенной роли
+    masks[0] = Capability.NONE
+    for name, capabilities in _ROLE_CAPABILITIES.items():
+        role = executed_codes[name] if name in executed_codes else role_names.index(name)
+        masks[role] |= capabilities
+    return tuple(masks)
+
+
+# Маска прав по номеру роли: ROLE_MASKS[user.Role]
+ROLE_MASKS = _build_role_masks()
+
+
+def capabilities_for_role(role: Optional[int]) -> Capability:
+    """
+    Возвращает права роли.
+    :param role: Номер роли из БД (None или неизвестная роль — без прав)
+    """
+    if role is None or not 0 <= role < len(ROLE_MASKS):
+        return Capability.NONE
+    return ROLE_MASKS[role]
+
+
+def roles_with(capability: Capability) -> tuple[int, ...]:
+    """Номера ролей, у которых есть все указанные права."""
+    return tuple(
+        role for role, mask in enumerate(ROLE_MASKS) if mask & capability == capability
+    )
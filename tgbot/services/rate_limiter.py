@@ -0,0 +1,52 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncRateLimiter:
+    """
+    Ограничитель частоты вызовов по алгоритму token bucket.
+
+    Ведро вмещает capacity токенов и пополняется со скоростью rate токенов в секунду.
+    Каждый вызов забирает один токен, а при пустом ведре ждет пополнения.
+    Используется как асинхронный контекстный менеджер: async with limiter: ...
+    """
+
+    def __init__(self, rate: float, capacity: Optional[int] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Забирает токен без ожидания. Возвращает False, если ведро пустое."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def acquire(self) -> None:
+        """Забирает один токен, при необходимости дожидаясь его появления."""
+        # Ожидающие обслуживаются по очереди, поэтому порядок вызовов сохраняется
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    async def __aenter__(self) -> "AsyncRateLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
@@ -0,0 +1,325 @@
+import asyncio
+import logging
+from typing import Optional, Sequence
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+
+from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.middlewares.message_pairing import store_message_connections
+
+logger = logging.getLogger(__name__)
+
+# Ограничение Bot API на кол-во сообщений в одном вызове copy_messages
+COPY_MESSAGES_LIMIT = 100
+# Сколько раз повторять копирование при флуд-лимите
+COPY_MAX_RETRIES = 3
+# Сколько правка ждет сохранения пары для еще не пересланного сообщения, в секундах
+EDIT_WAIT_TIMEOUT = 10
+
+
+async def _copy(method, **kwargs):
+    # Повтор безопасен: при флуд-лимите Telegram ничего не копирует
+    for attempt in range(COPY_MAX_RETRIES):
+        try:
+            return await method(**kwargs)
+        except TelegramRetryAfter as e:
+            if attempt == COPY_MAX_RETRIES - 1:
+                raise
+            logger.warning(
+                "[Пересылка] Флуд-лимит, повтор через %s с", e.retry_after
+            )
+            await asyncio.sleep(e.retry_after)
+
+
+async def relay_message(
+    bot: Bot,
+    message: Message,
+    chat_id: int | str,
+    message_thread_id: Optional[int] = None,
+    **kwargs,
+) -> int:
+    """
+    Пересылает одно сообщение через copy_message: контент не скачивается и не загружается заново.
+    :param bot: Экземпляр бота
+    :param message: Исходное сообщение
+    :param chat_id: Чат назначения
+    :param message_thread_id: Топик назначения (для форумов)
+    :param kwargs: Дополнительные параметры copy_message (reply_markup и т.п.)
+    :return: Идентификатор скопированного сообщения
+    """
+    result = await _copy(
+        bot.copy_message,
+        chat_id=chat_id,
+        from_chat_id=message.chat.id,
+        message_id=message.message_id,
+        message_thread_id=message_thread_id,
+        **kwargs,
+    )
+    return result.message_id
+
+
+class PartialRelayError(Exception):
+    """Пересылка пачки прервалась ошибкой, но часть сообщений уже скопирована."""
+
+    def __init__(self, relayed: list[tuple[int, int]], error: Exception) -> None:
+        super().__init__(str(error))
+        self.relayed = relayed
+
+
+async def relay_messages(
+    bot: Bot,
+    from_chat_id: int,
+    message_ids: Sequence[int],
+    chat_id: int | str,
+    message_thread_id: Optional[int] = None,
+) -> list[tuple[int, int]]:
+    """
+    Пересылает пачку сообщений из одного чата через copy_messages (до 100 за вызов).
+    Альбомы при этом остаются альбомами.
+    :param bot: Экземпляр бота
+    :param from_chat_id: Исходный чат
+    :param message_ids: Идентификаторы исходных сообщений
+    :param chat_id: Чат назначения
+    :param message_thread_id: Топик назначения (для форумов)
+    :return: Пары (исходный message_id, скопированный message_id)
+    :raises PartialRelayError: Ошибка после того, как часть сообщений уже скопирована
+    """
+    # copy_messages требует строго возрастающие идентификаторы
+    message_ids = sorted(set(message_ids))
+    relayed = []
+
+    for start in range(0, len(message_ids), COPY_MESSAGES_LIMIT):
+        chunk = message_ids[start : start + COPY_MESSAGES_LIMIT]
+
+        try:
+            if len(chunk) == 1:
+                result = await _copy(
+                    bot.copy_message,
+                    chat_id=chat_id,
+                    from_chat_id=from_chat_id,
+                    message_id=chunk[0],
+                    message_thread_id=message_thread_id,
+                )
+                relayed.append((chunk[0], result.message_id))
+                continue
+
+            results = await _copy(
+                bot.copy_messages,
+                chat_id=chat_id,
+                from_chat_id=from_chat_id,
+                message_ids=chunk,
+                message_thread_id=message_thread_id,
+            )
+        except Exception as e:
+            if relayed:
+                raise PartialRelayError(relayed, e) from e
+            raise
+
+        if len(results) != len(chunk):
+            # Telegram пропускает сообщения, которые нельзя скопировать, и не сообщает какие.
+            # Сопоставление по порядку направило бы правки не в те сообщения, поэтому пар нет.
+            # Повторно копировать по одному нельзя: сообщения уже скопированы
+            logger.warning(
+                "[Пересылка] Скопировано %s из %s сообщений, пары не сохраняются",
+                len(results),
+                len(chunk),
+            )
+            continue
+        relayed.extend(zip(chunk, (result.message_id for result in results)))
+
+    return relayed
+
+
+async def relay_album(
+    bot: Bot,
+    album: Sequence[Message],
+    chat_id: int | str,
+    message_thread_id: Optional[int] = None,
+) -> list[tuple[int, int]]:
+    """
+    Пересылает альбом одним вызовом copy_messages.
+    :param bot: Экземпляр бота
+    :param album: Сообщения альбома
+    :param chat_id: Чат назначения
+    :param message_thread_id: Топик назначения (для форумов)
+    :return: Пары (исходный message_id, скопированный message_id)
+    """
+    if not album:
+        return []
+
+    return await relay_messages(
+        bot,
+        from_chat_id=album[0].chat.id,
+        message_ids=[message.message_id for message in album],
+        chat_id=chat_id,
+        message_thread_id=message_thread_id,
+    )
+
+
+class CopyRelay:
+    """
+    Буфер пересылки сообщений между чатом специалиста и топиком.
+
+    Сообщения, пришедшие в одном направлении в течение window секунд, копируются одним вызовом
+    copy_messages, а пары сообщений для них записываются в БД одной транзакцией.
+    Порядок сообщений внутри направления сохраняется.
+
+    Пара сохраняется уже после того, как апдейт сообщения обработан, поэтому правка
+    сообщения должна дождаться ее через wait_relayed().
+    """
+
+    def __init__(self, bot: Bot, session_pool, window: float = 0.3) -> None:
+        self.bot = bot
+        self.session_pool = session_pool
+        self.window = window
+        self._buffers: dict[tuple, list[int]] = {}
+        self._flushes: set[asyncio.Task] = set()
+        # Флаши одного направления выполняются строго по очереди, чтобы не перемешать сообщения
+        self._locks: dict[tuple, asyncio.Lock] = {}
+        self._waiters: dict[tuple, int] = {}
+        # (исходный чат, message_id) -> событие сохранения пар его пачки
+        self._pending: dict[tuple[int, int], asyncio.Event] = {}
+        self._batch_done: dict[tuple, asyncio.Event] = {}
+
+    def enqueue(
+        self,
+        message: Message,
+        chat_id: int,
+        question_token: str,
+        direction: str,
+        message_thread_id: Optional[int] = None,
+    ) -> None:
+        """
+        Ставит сообщение в очередь на пересылку.
+        :param message: Исходное сообщение
+        :param chat_id: Чат назначения
+        :param question_token: Токен вопроса, к которому относится сообщение
+        :param direction: 'user_to_topic' или 'topic_to_user'
+        :param message_thread_id: Топик назначения (для форумов)
+        """
+        route = (
+            message.chat.id,
+            message.message_thread_id if message.is_topic_message else None,
+            chat_id,
+            message_thread_id,
+            question_token,
+            direction,
+        )
+        buffer = self._buffers.get(route)
+        if buffer is not None:
+            buffer.append(message.message_id)
+            self._pending[(message.chat.id, message.message_id)] = self._batch_done[route]
+            return
+
+        self._buffers[route] = [message.message_id]
+        done = self._batch_done[route] = asyncio.Event()
+        self._pending[(message.chat.id, message.message_id)] = done
+        task = asyncio.create_task(self._flush_later(route))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush_later(self, route: tuple) -> None:
+        await asyncio.sleep(self.window)
+        await self._flush(route)
+
+    async def _flush(self, route: tuple) -> None:
+        lock = self._locks.get(route)
+        if lock is None:
+            lock = self._locks[route] = asyncio.Lock()
+        self._waiters[route] = self._waiters.get(route, 0) + 1
+
+        try:
+            async with lock:
+                message_ids = self._buffers.pop(route, None)
+                if message_ids:
+                    done = self._batch_done.pop(route)
+                    try:
+                        await self._relay(route, message_ids)
+                    finally:
+                        for message_id in message_ids:
+                            self._pending.pop((route[0], message_id), None)
+                        done.set()
+        finally:
+            self._waiters[route] -= 1
+            if not self._waiters[route]:
+                del self._waiters[route]
+                del self._locks[route]
+
+    async def wait_relayed(self, chat_id: int, message_id: int) -> None:
+        """
+        Ждет, пока сообщение из буфера будет переслано и его пара сохранена.
+        Для сообщений, которых нет в буфере, возвращается сразу.
+        :param chat_id: Исходный чат
+        :param message_id: Исходное сообщение
+        """
+        done = self._pending.get((chat_id, message_id))
+        if done is None:
+            return
+        try:
+            await asyncio.wait_for(done.wait(), timeout=EDIT_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "[Пересылка] Не дождались пересылки сообщения %s:%s", chat_id, message_id
+            )
+
+    async def _relay(self, route: tuple, message_ids: list[int]) -> None:
+        (
+            from_chat_id,
+            from_thread_id,
+            chat_id,
+            message_thread_id,
+            question_token,
+            direction,
+        ) = route
+
+        try:
+            relayed = await relay_messages(
+                self.bot,
+                from_chat_id=from_chat_id,
+                message_ids=message_ids,
+                chat_id=chat_id,
+                message_thread_id=message_thread_id,
+            )
+        except PartialRelayError as e:
+            # Пары уже скопированных сообщений все равно сохраняем
+            logger.error("[Пересылка] Не удалось переслать часть сообщений: %s", e)
+            relayed = e.relayed
+        except Exception as e:
+            logger.error("[Пересылка] Не удалось переслать сообщения: %s", e)
+            return
+
+        if direction == "user_to_topic":
+            user_chat_id, topic_chat_id, topic_thread_id = (
+                from_chat_id,
+                chat_id,
+                message_thread_id,
+            )
+        else:
+            user_chat_id, topic_chat_id, topic_thread_id = (
+                chat_id,
+                from_chat_id,
+                from_thread_id,
+            )
+
+        try:
+            async with self.session_pool() as session:
+                await store_message_connections(
+                    RequestsRepo(session),
+                    relayed=relayed,
+                    user_chat_id=user_chat_id,
+                    topic_chat_id=topic_chat_id,
+                    topic_thread_id=topic_thread_id,
+                    question_token=question_token,
+                    direction=direction,
+                )
+        except Exception:
+            # Ошибка уже залогирована в store_message_connections
+            pass
+
+    async def close(self) -> None:
+        """Немедленно пересылает все накопленные сообщения. Используется при остановке бота."""
+        await asyncio.gather(*(self._flush(route) for route in list(self._buffers)))
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
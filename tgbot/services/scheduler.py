@@ -1,26 +1,37 @@
+import asyncio
 import datetime
+import json
 import logging
+from pathlib import Path
 
 import pytz
 from aiogram import Bot
 from aiogram.types import ReplyKeyboardRemove
+from apscheduler.events import (
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_SUBMITTED,
+    JobExecutionEvent,
+    JobSubmissionEvent,
+)
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy import Sequence
 
 from infrastructure.database.models import MessagesPair, Question
 from infrastructure.database.repo.requests import RequestsRepo
-from tgbot.config import load_config
+from tgbot.config import get_config
 from tgbot.keyboards.group.main import closed_question_duty_kb
 from tgbot.keyboards.user.main import closed_question_specialist_kb
 from tgbot.misc import dicts
-from tgbot.services.logger import setup_logging
+from tgbot.services.topics import topic_updates
 
 scheduler = AsyncIOScheduler(timezone=pytz.utc)
-config = load_config(".env")
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
+PENDING_TIMERS_PATH = Path("cache/pending_timers.json")
+
 
 async def delete_messages(bot: Bot, chat_id: int, message_ids: list[int]):
     """Удаляет список сообщений."""
@@ -28,7 +39,7 @@ async def delete_messages(bot: Bot, chat_id: int, message_ids: list[int]):
         for message_id in message_ids:
             await bot.delete_message(chat_id=chat_id, message_id=message_id)
     except Exception as e:
-        print(f"Ошибка при удалении сообщений: {e}")
+        logger.error("[Удаление сообщений] Ошибка при удалении сообщений: %s", e)
 
 
 async def run_delete_timer(
@@ -44,7 +55,9 @@ async def run_delete_timer(
             args=[bot, chat_id, message_ids],
         )
     except Exception as e:
-        print(f"Ошибка при планировании удаления сообщений: {e}")
+        logger.error(
+            "[Удаление сообщений] Ошибка при планировании удаления сообщений: %s", e
+        )
 
 
 async def remove_question_timer(bot: Bot, question: Question):
@@ -90,107 +103,214 @@ async def remove_old_topics(bot: Bot, session_pool):
                 )
             except Exception as e:
                 logger.error(
-                    f"[Старые топики] Ошибка при удалении топика {question.topic_id}: {e}"
+                    "[Старые топики] Ошибка при удалении топика %s: %s",
+                    question.topic_id,
+                    e,
                 )
 
         logger.info(
-            f"[Старые топики] Успешно удалено {questions_result['deleted_count']} из {questions_result['total_count']} старых вопросов"
+            "[Старые топики] Успешно удалено %s из %s старых вопросов",
+            questions_result["deleted_count"],
+            questions_result["total_count"],
         )
         logger.info(
-            f"[Старые пары] Успешно удалено {pairs_result['deleted_count']} из {pairs_result['total_count']} старых пар сообщений"
+            "[Старые пары] Успешно удалено %s из %s старых пар сообщений",
+            pairs_result["deleted_count"],
+            pairs_result["total_count"],
         )
 
         if questions_result["errors"]:
             logger.info(
-                f"[Старые топики] Произошла ошибка при удалении части вопросов: {questions_result['errors']}"
+                "[Старые топики] Произошла ошибка при удалении части вопросов: %s",
+                questions_result["errors"],
             )
         if pairs_result["errors"]:
             logger.info(
-                f"[Старые пары] Произошла ошибка при удалении части пар: {pairs_result['errors']}"
+                "[Старые пары] Произошла ошибка при удалении части пар: %s",
+                pairs_result["errors"],
             )
 
 
+async def _send_warning(bot: Bot, question: Question, config) -> None:
+    # Отправляем предупреждение в топик
+    await bot.send_message(
+        chat_id=question.group_id,
+        message_thread_id=question.topic_id,
+        text=f"⚠️ <b>Внимание!</b>\n\nЧат будет автоматически закрыт через {config.tg_bot.activity_warn_minutes} минут при отсутствии активности",
+    )
+
+    # Отправляем предупреждение пользователю
+    await bot.send_message(
+        chat_id=question.employee_chat_id,
+        text=f"⚠️ <b>Внимание!</b>\n\nТвой вопрос будет автоматически закрыт через {config.tg_bot.activity_warn_minutes} минут при отсутствии активности",
+    )
+
+
 async def send_inactivity_warning(
     bot: Bot, question_token: str, questions_repo: RequestsRepo
 ):
     """Отправляет предупреждение о бездействии через 5 минут."""
+    config = get_config()
     try:
         question: Question = await questions_repo.questions.get_question(
             token=question_token
         )
 
         if question and question.status in ["open", "in_progress"]:
-            # Отправляем предупреждение в топик
-            await bot.send_message(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                text=f"⚠️ <b>Внимание!</b>\n\nЧат будет автоматически закрыт через {config.tg_bot.activity_warn_minutes} минут при отсутствии активности",
-            )
-
-            # Отправляем предупреждение пользователю
-            await bot.send_message(
-                chat_id=question.employee_chat_id,
-                text=f"⚠️ <b>Внимание!</b>\n\nТвой вопрос будет автоматически закрыт через {config.tg_bot.activity_warn_minutes} минут при отсутствии активности",
-            )
+            await _send_warning(bot, question, config)
 
     except Exception as e:
         logger.error(
-            f"[Таймер бездействия] Ошибка при отправке предупреждения для вопроса {question_token}: {e}"
+            "[Таймер бездействия] Ошибка при отправке предупреждения для вопроса %s: %s",
+            question_token,
+            e,
         )
 
 
+async def _notify_closed(bot: Bot, question: Question, config) -> None:
+    """
+    Уведомляет топик и специалиста об автоматическом закрытии вопроса.
+    Уведомления отправляются параллельно, а изменение топика уходит в очередь с ограничением частоты.
+    """
+
+    async def notify_topic():
+        await bot.send_message(
+            chat_id=question.group_id,
+            message_thread_id=question.topic_id,
+            text=f"🔒 <b>Вопрос автоматически закрыт</b>\n\nВопрос был закрыт из-за отсутствия активности в течение {config.tg_bot.activity_close_minutes} минут",
+            reply_markup=closed_question_duty_kb(token=question.token),
+        )
+
+    async def notify_employee():
+        # Сообщения специалисту должны прийти по порядку
+        await bot.send_message(
+            chat_id=question.employee_chat_id,
+            text="🔒 <b>Вопрос автоматически закрыт</b>",
+            reply_markup=ReplyKeyboardRemove(),
+        )
+        await bot.send_message(
+            chat_id=question.employee_chat_id,
+            text=f"Твой вопрос был закрыт из-за отсутствия активности в течение {config.tg_bot.activity_close_minutes} минут",
+            reply_markup=closed_question_specialist_kb(token=question.token),
+        )
+
+    topic_updates.put(
+        bot,
+        chat_id=question.group_id,
+        topic_id=question.topic_id,
+        name=question.token,
+        icon_custom_emoji_id=dicts.topicEmojis["closed"],
+        close=True,
+    )
+
+    for result in await asyncio.gather(
+        notify_topic(), notify_employee(), return_exceptions=True
+    ):
+        if isinstance(result, Exception):
+            logger.error(
+                "[Таймер бездействия] Ошибка уведомления о закрытии вопроса %s: %s",
+                question.token,
+                result,
+            )
+
+
 async def auto_close_question(
     bot: Bot, question_token: str, questions_repo: RequestsRepo
 ):
-    """Автоматически закрывает вопрос через 10 минут бездействия."""
+    """
+    Автоматически закрывает вопрос через 10 минут бездействия.
+    Статус меняется одним запросом, после чего отправляются уведомления.
+    """
+    config = get_config()
     try:
-        question: Question = await questions_repo.questions.get_question(
-            token=question_token
+        question = await questions_repo.questions.close_question(
+            token=question_token, end_time=datetime.datetime.now()
         )
+        if question is None:
+            # Вопрос уже закрыт или удален
+            return
 
-        if question and question.status in ["open", "in_progress"]:
-            # Закрываем вопрос
-            await questions_repo.questions.update_question_status(
-                token=question_token, status="closed"
-            )
-            await questions_repo.questions.update_question_end(
-                token=question_token, end_time=datetime.datetime.now()
-            )
+        await _notify_closed(bot, question, config)
 
-            # Уведомляем о закрытии
-            await bot.send_message(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                text=f"🔒 <b>Вопрос автоматически закрыт</b>\n\nВопрос был закрыт из-за отсутствия активности в течение {config.tg_bot.activity_close_minutes} минут",
-                reply_markup=closed_question_duty_kb(token=question_token),
-            )
+    except Exception as e:
+        logger.error(
+            "[Таймер бездействия] Ошибка при автоматическом закрытии вопроса %s: %s",
+            question_token,
+            e,
+        )
 
-            # Обновляем топик
-            await bot.edit_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                name=question.token,
-                icon_custom_emoji_id=dicts.topicEmojis["closed"],
-            )
-            await bot.close_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-            )
 
-            await bot.send_message(
-                chat_id=question.employee_chat_id,
-                text="🔒 <b>Вопрос автоматически закрыт</b>",
-                reply_markup=ReplyKeyboardRemove(),
+def _log_batch_errors(results, action: str) -> None:
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("[Поиск бездействия] Ошибка %s: %s", action, result)
+
+
+async def sweep_inactive_questions(bot: Bot, session_pool) -> None:
+    """
+    Один проход поиска бездействующих вопросов (ACTIVITY_ENGINE=sweep).
+    Вопросы берутся пачками по индексу last_activity_at: сначала закрываются те,
+    что молчат дольше activity_close_minutes, затем предупреждаются молчащие
+    дольше activity_warn_minutes. Уведомления внутри пачки отправляются параллельно.
+    """
+    config = get_config()
+    now = datetime.datetime.now()
+    close_before = now - datetime.timedelta(minutes=config.tg_bot.activity_close_minutes)
+    warn_before = now - datetime.timedelta(minutes=config.tg_bot.activity_warn_minutes)
+    closed = warned = 0
+
+    async with session_pool() as session:
+        questions_repo = RequestsRepo(session).questions
+
+        cursor = None
+        while batch := await questions_repo.get_inactive_questions(
+            before=close_before,
+            activity_status_default=config.tg_bot.activity_status,
+            cursor=cursor,
+        ):
+            cursor = (batch[-1].last_activity_at, batch[-1].token)
+            # Сессия одна, поэтому запросы к БД идут по очереди, а уведомления — параллельно
+            closed_questions = []
+            for question in batch:
+                closed_question = await questions_repo.close_question(
+                    token=question.token, end_time=now
+                )
+                if closed_question is not None:
+                    closed_questions.append(closed_question)
+            _log_batch_errors(
+                await asyncio.gather(
+                    *(_notify_closed(bot, q, config) for q in closed_questions),
+                    return_exceptions=True,
+                ),
+                "закрытия",
             )
-            await bot.send_message(
-                chat_id=question.employee_chat_id,
-                text=f"Твой вопрос был закрыт из-за отсутствия активности в течение {config.tg_bot.activity_close_minutes} минут",
-                reply_markup=closed_question_specialist_kb(token=question_token),
+            closed += len(closed_questions)
+
+        cursor = None
+        while batch := await questions_repo.get_inactive_questions(
+            before=warn_before,
+            activity_status_default=config.tg_bot.activity_status,
+            only_unwarned=True,
+            cursor=cursor,
+        ):
+            cursor = (batch[-1].last_activity_at, batch[-1].token)
+            await questions_repo.mark_questions_warned(
+                [question.token for question in batch], at=now
             )
+            _log_batch_errors(
+                await asyncio.gather(
+                    *(_send_warning(bot, q, config) for q in batch),
+                    return_exceptions=True,
+                ),
+                "предупреждения",
+            )
+            warned += len(batch)
 
-    except Exception as e:
-        logger.error(
-            f"[Таймер бездействия] Ошибка при автоматическом закрытии вопроса {question_token}: {e}"
+    if closed or warned:
+        logger.info(
+            "[Поиск бездействия] Закрыто вопросов: %s, предупреждений: %s",
+            closed,
+            warned,
         )
 
 
@@ -198,6 +318,7 @@ async def start_inactivity_timer(
     question_token: str, bot: Bot, questions_repo: RequestsRepo
 ):
     """Запускает таймер бездействия для вопроса."""
+    config = get_config()
     try:
         # Проверяем, нужно ли запускать тайметр для этого вопроса
         question = await questions_repo.questions.get_question(token=question_token)
@@ -215,6 +336,13 @@ async def start_inactivity_timer(
             # Если активность отключена для этого топика, не запускаем таймер
             return
 
+        if config.tg_bot.activity_engine == "sweep":
+            # Таймеров нет — бездействие найдет периодический поиск по last_activity_at
+            await questions_repo.questions.touch_question_activity(
+                token=question_token
+            )
+            return
+
         # Удаляем существующие задачи для этого вопроса
         stop_inactivity_timer(question_token)
 
@@ -242,7 +370,9 @@ async def start_inactivity_timer(
 
     except Exception as e:
         logger.error(
-            f"[Таймер бездействия] Ошибка при запуске таймера для вопроса {question_token}: {e}"
+            "[Таймер бездействия] Ошибка при запуске таймера для вопроса %s: %s",
+            question_token,
+            e,
         )
 
 
@@ -261,7 +391,9 @@ def stop_inactivity_timer(question_token: str):
 
     except Exception as e:
         logger.error(
-            f"[Таймер бездействия] Ошибка при остановке таймера для вопроса {question_token}: {e}"
+            "[Таймер бездействия] Ошибка при остановке таймера для вопроса %s: %s",
+            question_token,
+            e,
         )
 
 
@@ -273,3 +405,118 @@ async def restart_inactivity_timer(
     await start_inactivity_timer(
         question_token=question_token, bot=bot, questions_repo=questions_repo
     )
+
+
+async def _run_inactivity_job(
+    kind: str, bot: Bot, question_token: str, session_pool
+):
+    """Выполняет восстановленный после перезапуска таймер бездействия в собственной сессии БД."""
+    job = send_inactivity_warning if kind == "warning" else auto_close_question
+    async with session_pool() as session:
+        await job(bot, question_token, RequestsRepo(session))
+
+
+def persist_pending_timers(path: Path = PENDING_TIMERS_PATH) -> int:
+    """
+    Сохраняет ожидающие таймеры бездействия в файл, чтобы восстановить их после перезапуска.
+    :param path: Путь к файлу
+    :return: Кол-во сохраненных таймеров
+    """
+    timers = []
+    for job in scheduler.get_jobs():
+        kind, _, token = job.id.partition("_")
+        if kind not in ("warning", "close") or not token:
+            continue
+        timers.append(
+            {
+                "kind": kind,
+                "token": token,
+                "run_date": job.next_run_time.isoformat(),
+            }
+        )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(timers))
+    logger.info("[Планировщик] Сохранено таймеров бездействия: %s", len(timers))
+    return len(timers)
+
+
+def restore_pending_timers(
+    bot: Bot, session_pool, path: Path = PENDING_TIMERS_PATH
+) -> int:
+    """
+    Восстанавливает таймеры бездействия, сохраненные при прошлой остановке.
+    Просроченные таймеры выполняются сразу после запуска.
+    :param bot: Экземпляр бота
+    :param session_pool: Пул сессий БД вопросника
+    :param path: Путь к файлу
+    :return: Кол-во восстановленных таймеров
+    """
+    try:
+        timers = json.loads(path.read_text())
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError) as e:
+        logger.error("[Планировщик] Не удалось прочитать сохраненные таймеры: %s", e)
+        return 0
+
+    now = datetime.datetime.now(tz=pytz.utc)
+    for timer in timers:
+        run_date = max(datetime.datetime.fromisoformat(timer["run_date"]), now)
+        scheduler.add_job(
+            _run_inactivity_job,
+            "date",
+            run_date=run_date,
+            args=[timer["kind"], bot, timer["token"], session_pool],
+            id=f"{timer['kind']}_{timer['token']}",
+            replace_existing=True,
+        )
+
+    path.unlink(missing_ok=True)
+    logger.info("[Планировщик] Восстановлено таймеров бездействия: %s", len(timers))
+    return len(timers)
+
+
+# Запуски задач, отправленные исполнителю и еще не завершенные
+_running_jobs = 0
+_jobs_idle = asyncio.Event()
+_jobs_idle.set()
+
+
+def _on_job_submitted(event: JobSubmissionEvent) -> None:
+    global _running_jobs
+    # Каждый пропущенный запуск исполнитель завершает своим событием
+    _running_jobs += len(event.scheduled_run_times)
+    _jobs_idle.clear()
+
+
+def _on_job_finished(event: JobExecutionEvent) -> None:
+    global _running_jobs
+    _running_jobs = max(_running_jobs - 1, 0)
+    if not _running_jobs:
+        _jobs_idle.set()
+
+
+scheduler.add_listener(_on_job_submitted, EVENT_JOB_SUBMITTED)
+scheduler.add_listener(
+    _on_job_finished, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED
+)
+
+
+async def shutdown_scheduler():
+    """
+    Останавливает планировщик, не теряя таймеры.
+    Новые задачи перестают запускаться, выполняющиеся задачи дорабатывают,
+    ожидающие таймеры бездействия сохраняются на диск.
+    """
+    if not scheduler.running:
+        return
+
+    scheduler.pause()
+    persist_pending_timers()
+
+    if _running_jobs:
+        logger.info("[Планировщик] Ожидаем завершения %s задач", _running_jobs)
+        await _jobs_idle.wait()
+
+    scheduler.shutdown(wait=False)
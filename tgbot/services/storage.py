@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import random
+import zlib
+from typing import Any, Callable, Mapping, Optional, TypeVar, cast
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Данные FSM больше этого размера (в байтах) хранятся сжатыми
+COMPRESS_THRESHOLD = 1024
+# Метка сжатых данных. JSON-объект всегда начинается с "{", так что путаницы нет
+COMPRESSED_PREFIX = b"z:"
+# Сколько раз повторять атомарное обновление, если ключ изменили параллельно
+MAX_WATCH_RETRIES = 50
+
+
+class PipelinedRedisStorage(RedisStorage):
+    """
+    Хранилище FSM в Redis с меньшим числом обращений к серверу.
+
+    - Состояние и данные читаются и пишутся одним конвейером (pipeline).
+    - update_data выполняется атомарно через WATCH/MULTI: параллельные изменения
+      одного диалога не затирают друг друга.
+    - Данные больше COMPRESS_THRESHOLD байт сжимаются zlib.
+    - При каждой записи продлевается TTL и состояния, и данных, поэтому брошенные
+      диалоги истекают целиком, а активные — нет.
+    """
+
+    def _encode(self, data: Mapping[str, Any]) -> bytes:
+        raw = self.json_dumps(data).encode("utf-8")
+        if len(raw) < COMPRESS_THRESHOLD:
+            return raw
+        return COMPRESSED_PREFIX + zlib.compress(raw)
+
+    def _decode(self, value: Optional[bytes | str]) -> dict[str, Any]:
+        if value is None:
+            return {}
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        if value.startswith(COMPRESSED_PREFIX):
+            value = zlib.decompress(value[len(COMPRESSED_PREFIX) :])
+        return cast(dict[str, Any], self.json_loads(value.decode("utf-8")))
+
+    @staticmethod
+    def _decode_state(value: Optional[bytes | str]) -> Optional[str]:
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return value
+
+    def _keys(self, key: StorageKey) -> tuple[str, str]:
+        return self.key_builder.build(key, "state"), self.key_builder.build(key, "data")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_key, data_key = self._keys(key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if state is None:
+                pipe.delete(state_key)
+            else:
+                pipe.set(
+                    state_key,
+                    cast(str, state.state if isinstance(state, State) else state),
+                    ex=self.state_ttl,
+                )
+                if self.data_ttl:
+                    pipe.expire(data_key, self.data_ttl)
+            await pipe.execute()
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        state_key, data_key = self._keys(key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if not data:
+                pipe.delete(data_key)
+            else:
+                pipe.set(data_key, self._encode(data), ex=self.data_ttl)
+            if self.state_ttl:
+                pipe.expire(state_key, self.state_ttl)
+            await pipe.execute()
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return self._decode(await self.redis.get(self.key_builder.build(key, "data")))
+
+    async def get_state_and_data(
+        self, key: StorageKey
+    ) -> tuple[Optional[str], dict[str, Any]]:
+        """
+        Читает состояние и данные за одно обращение к Redis.
+        :param key: Ключ FSM
+        :return: Состояние и данные
+        """
+        state_key, data_key = self._keys(key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(state_key)
+            pipe.get(data_key)
+            state, data = await pipe.execute()
+        return self._decode_state(state), self._decode(data)
+
+    async def set_state_and_data(
+        self, key: StorageKey, state: StateType, data: Mapping[str, Any]
+    ) -> None:
+        """
+        Записывает состояние и данные за одно обращение к Redis.
+        set_state_and_data(key, None, {}) очищает FSM целиком.
+        :param key: Ключ FSM
+        :param state: Новое состояние
+        :param data: Новые данные
+        """
+        state_key, data_key = self._keys(key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if state is None:
+                pipe.delete(state_key)
+            else:
+                pipe.set(
+                    state_key,
+                    cast(str, state.state if isinstance(state, State) else state),
+                    ex=self.state_ttl,
+                )
+            if not data:
+                pipe.delete(data_key)
+            else:
+                pipe.set(data_key, self._encode(data), ex=self.data_ttl)
+            await pipe.execute()
+
+    async def modify_data(
+        self,
+        key: StorageKey,
+        modify: Callable[[dict[str, Any]], tuple[T, Mapping[str, Any]]],
+    ) -> T:
+        """
+        Атомарно изменяет данные FSM (WATCH/MULTI). При параллельной записи изменение
+        повторяется на свежих данных.
+        :param key: Ключ FSM
+        :param modify: Функция, получающая текущие данные и возвращающая (результат, новые данные)
+        :return: Результат функции modify
+        """
+        state_key, data_key = self._keys(key)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for attempt in range(MAX_WATCH_RETRIES):
+                try:
+                    await pipe.watch(data_key)
+                    result, data = modify(self._decode(await pipe.get(data_key)))
+                    pipe.multi()
+                    if not data:
+                        pipe.delete(data_key)
+                    else:
+                        pipe.set(data_key, self._encode(data), ex=self.data_ttl)
+                    if self.state_ttl:
+                        pipe.expire(state_key, self.state_ttl)
+                    await pipe.execute()
+                    return result
+                except WatchError:
+                    # Случайная пауза разводит конкурирующие обновления
+                    await asyncio.sleep(random.uniform(0, 0.005 * (attempt + 1)))
+        raise RuntimeError(
+            f"Не удалось обновить данные FSM {data_key} за {MAX_WATCH_RETRIES} попыток"
+        )
+
+    async def update_data(
+        self, key: StorageKey, data: Mapping[str, Any]
+    ) -> dict[str, Any]:
+        def merge(current: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+            current.update(data)
+            return current, current
+
+        return await self.modify_data(key, merge)
+
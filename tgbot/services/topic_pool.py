@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from tgbot.services.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+TOPIC_POOL_PATH = Path("cache/topic_pool.json")
+
+# Название топика, ожидающего вопроса
+RESERVE_TOPIC_NAME = "Резерв"
+# Время, на которое должно хватить запаса топиков, пока пул пополняется, в секундах
+REFILL_HORIZON = 120
+# Вес нового интервала между вопросами в экспоненциальном среднем
+ARRIVAL_ALPHA = 0.2
+
+
+class TopicPool:
+    """
+    Пул заранее созданных закрытых топиков в форумах.
+
+    Новый вопрос забирает топик из пула — переименовывает и открывает его — вместо
+    создания через create_forum_topic. Пул пополняется в фоне с ограничением частоты
+    вызовов Bot API. Размер пула по каждому форуму подстраивается под частоту вопросов
+    (экспоненциальное среднее интервала между ними) в пределах [min_size, max_size].
+    Свободные топики сохраняются в cache/ и переживают перезапуск бота.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        forum_ids: list[int],
+        min_size: int = 2,
+        max_size: int = 20,
+        rate: float = 1,
+        path: Path = TOPIC_POOL_PATH,
+    ) -> None:
+        self.bot = bot
+        self.min_size = min_size
+        self.max_size = max_size
+        self.path = path
+        self.limiter = AsyncRateLimiter(rate=rate)
+        self.topics: dict[int, deque[int]] = {
+            forum_id: deque() for forum_id in forum_ids
+        }
+        # Экспоненциальное среднее интервала между вопросами и время последнего вопроса
+        self._interval: dict[int, float] = {}
+        self._last_arrival: dict[int, float] = {}
+        self._refills: dict[int, asyncio.Task] = {}
+
+    def target_size(self, forum_id: int) -> int:
+        """Желаемое кол-во свободных топиков в форуме по наблюдаемой частоте вопросов."""
+        interval = self._interval.get(forum_id)
+        if interval is None:
+            return self.min_size
+        # Пока вопросов нет, оценка частоты плавно снижается
+        idle = time.monotonic() - self._last_arrival[forum_id]
+        interval = max(interval, idle)
+        return max(
+            self.min_size, min(self.max_size, math.ceil(REFILL_HORIZON / interval))
+        )
+
+    def _record_arrival(self, forum_id: int) -> None:
+        now = time.monotonic()
+        last = self._last_arrival.get(forum_id)
+        self._last_arrival[forum_id] = now
+        if last is None:
+            return
+        interval = max(now - last, 1.0)
+        previous = self._interval.get(forum_id, interval)
+        self._interval[forum_id] = (
+            ARRIVAL_ALPHA * interval + (1 - ARRIVAL_ALPHA) * previous
+        )
+
+    async def claim(
+        self, forum_id: int, name: str, icon_custom_emoji_id: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Забирает свободный топик из пула: переименовывает и открывает его.
+        :param forum_id: Форум
+        :param name: Название топика
+        :param icon_custom_emoji_id: Иконка топика
+        :return: Идентификатор топика или None, если свободных топиков нет
+        """
+        self._record_arrival(forum_id)
+        topics = self.topics.setdefault(forum_id, deque())
+        try:
+            while topics:
+                topic_id = topics.popleft()
+                done = False
+                try:
+                    await self.bot.edit_forum_topic(
+                        chat_id=forum_id,
+                        message_thread_id=topic_id,
+                        name=name,
+                        icon_custom_emoji_id=icon_custom_emoji_id,
+                    )
+                    await self.bot.reopen_forum_topic(
+                        chat_id=forum_id, message_thread_id=topic_id
+                    )
+                    done = True
+                    return topic_id
+                except TelegramBadRequest as e:
+                    # Топик могли удалить вручную — берем следующий
+                    logger.warning(
+                        "[Пул топиков] Топик %s в %s недоступен: %s", topic_id, forum_id, e
+                    )
+                    done = True
+                finally:
+                    # При флуд-лимите, сетевой ошибке или отмене топик остается в пуле
+                    if not done:
+                        topics.appendleft(topic_id)
+            return None
+        finally:
+            self.refill(forum_id)
+
+    async def open_topic(
+        self, forum_id: int, name: str, icon_custom_emoji_id: Optional[str] = None
+    ) -> int:
+        """
+        Возвращает топик для нового вопроса: из пула, а если он пуст — созданный сразу.
+        :return: Идентификатор топика
+        """
+        topic_id = await self.claim(forum_id, name, icon_custom_emoji_id)
+        if topic_id is not None:
+            return topic_id
+
+        topic = await self.bot.create_forum_topic(
+            chat_id=forum_id, name=name, icon_custom_emoji_id=icon_custom_emoji_id
+        )
+        return topic.message_thread_id
+
+    def refill(self, forum_id: Optional[int] = None) -> None:
+        """Запускает фоновое пополнение пула одного или всех форумов."""
+        for forum_id in [forum_id] if forum_id is not None else list(self.topics):
+            task = self._refills.get(forum_id)
+            if task is None or task.done():
+                self._refills[forum_id] = asyncio.create_task(self._refill(forum_id))
+
+    async def _refill(self, forum_id: int) -> None:
+        topics = self.topics.setdefault(forum_id, deque())
+        while len(topics) < self.target_size(forum_id):
+            await self.limiter.acquire()
+            try:
+                topic = await self.bot.create_forum_topic(
+                    chat_id=forum_id, name=RESERVE_TOPIC_NAME
+                )
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                logger.error("[Пул топиков] Не удалось пополнить пул %s: %s", forum_id, e)
+                return
+
+            try:
+                await self._close_reserve(forum_id, topic.message_thread_id)
+            except Exception as e:
+                logger.error(
+                    "[Пул топиков] Не удалось закрыть резервный топик %s в %s: %s",
+                    topic.message_thread_id,
+                    forum_id,
+                    e,
+                )
+                await self._delete_reserve(forum_id, topic.message_thread_id)
+                return
+            # В пул попадают только закрытые топики: открытый "Резерв" виден в форуме
+            topics.append(topic.message_thread_id)
+
+    async def _close_reserve(self, forum_id: int, topic_id: int) -> None:
+        # Созданный топик повторно не создаем: при флуд-лимите ждем и закрываем его же
+        while True:
+            await self.limiter.acquire()
+            try:
+                await self.bot.close_forum_topic(
+                    chat_id=forum_id, message_thread_id=topic_id
+                )
+                return
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+
+    async def _delete_reserve(self, forum_id: int, topic_id: int) -> None:
+        # Незакрытый резерв в пул не берем, иначе он так и останется открытым в форуме
+        try:
+            await self.bot.delete_forum_topic(chat_id=forum_id, message_thread_id=topic_id)
+        except Exception as e:
+            logger.error(
+                "[Пул топиков] Не удалось удалить резервный топик %s в %s, удалите его вручную: %s",
+                topic_id,
+                forum_id,
+                e,
+            )
+
+    def load(self) -> None:
+        try:
+            state = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error("[Пул топиков] Не удалось прочитать пул: %s", e)
+            return
+
+        for forum_id, topic_ids in state.items():
+            # Топики форумов, убранных из конфига, не подхватываем
+            if int(forum_id) in self.topics:
+                self.topics[int(forum_id)].extend(topic_ids)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(
+            json.dumps({forum_id: list(topics) for forum_id, topics in self.topics.items()})
+        )
+
+    async def close(self) -> None:
+        """Останавливает пополнение и сохраняет свободные топики. Используется при остановке бота."""
+        for task in self._refills.values():
+            task.cancel()
+        await asyncio.gather(*self._refills.values(), return_exceptions=True)
+        self._refills.clear()
+        self.save()
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from tgbot.services.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Кол-во вызовов Bot API в секунду на изменение топиков
+TOPIC_UPDATES_RATE = 5
+
+
+@dataclass
+class TopicUpdate:
+    """
+    Новое состояние топика.
+
+    Attributes:
+        bot: Экземпляр бота.
+        name: Новое название (None — не менять).
+        icon_custom_emoji_id: Новая иконка (None — не менять).
+        close: Закрыть топик после изменения.
+    """
+
+    bot: Bot
+    name: Optional[str] = None
+    icon_custom_emoji_id: Optional[str] = None
+    close: bool = False
+
+
+class TopicUpdateQueue:
+    """
+    Очередь изменений топиков (название, иконка, закрытие) с ограничением частоты вызовов Bot API.
+
+    Изменения ключуются по (chat_id, topic_id): пока изменение ждет отправки, новое изменение
+    того же топика дополняет его, поэтому каждый топик правится не больше одного раза.
+    При TelegramRetryAfter изменение повторяется после паузы.
+    """
+
+    def __init__(self, rate: float = TOPIC_UPDATES_RATE, max_retries: int = 3) -> None:
+        self.limiter = AsyncRateLimiter(rate=rate)
+        self.max_retries = max_retries
+        self._pending: OrderedDict[tuple[int, int], TopicUpdate] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def put(
+        self,
+        bot: Bot,
+        chat_id: int,
+        topic_id: int,
+        name: Optional[str] = None,
+        icon_custom_emoji_id: Optional[str] = None,
+        close: bool = False,
+    ) -> None:
+        """
+        Ставит изменение топика в очередь.
+        :param bot: Экземпляр бота
+        :param chat_id: Форум
+        :param topic_id: Топик
+        :param name: Новое название
+        :param icon_custom_emoji_id: Новая иконка
+        :param close: Закрыть топик
+        """
+        update = self._pending.get((chat_id, topic_id))
+        if update is None:
+            self._pending[(chat_id, topic_id)] = TopicUpdate(
+                bot, name, icon_custom_emoji_id, close
+            )
+        else:
+            update.name = name or update.name
+            update.icon_custom_emoji_id = (
+                icon_custom_emoji_id or update.icon_custom_emoji_id
+            )
+            update.close = close or update.close
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+        self._wakeup.set()
+
+    async def _work(self) -> None:
+        while True:
+            if not self._pending:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            (chat_id, topic_id), update = self._pending.popitem(last=False)
+            await self._apply(chat_id, topic_id, update)
+
+    async def _call(self, chat_id: int, topic_id: int, method, **kwargs) -> None:
+        for attempt in range(self.max_retries):
+            await self.limiter.acquire()
+            try:
+                await method(chat_id=chat_id, message_thread_id=topic_id, **kwargs)
+                return
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries - 1:
+                    logger.error(
+                        "[Топики] Флуд-лимит при изменении топика %s в %s", topic_id, chat_id
+                    )
+                    return
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                # TOPIC_NOT_MODIFIED и уже закрытый топик — не ошибка
+                logger.debug("[Топики] Топик %s в %s не изменен: %s", topic_id, chat_id, e)
+                return
+            except Exception as e:
+                logger.error(
+                    "[Топики] Не удалось изменить топик %s в %s: %s", topic_id, chat_id, e
+                )
+                return
+
+    async def _apply(self, chat_id: int, topic_id: int, update: TopicUpdate) -> None:
+        if update.name or update.icon_custom_emoji_id:
+            await self._call(
+                chat_id,
+                topic_id,
+                update.bot.edit_forum_topic,
+                name=update.name,
+                icon_custom_emoji_id=update.icon_custom_emoji_id,
+            )
+        if update.close:
+            await self._call(chat_id, topic_id, update.bot.close_forum_topic)
+
+    async def close(self) -> None:
+        """Отправляет ожидающие изменения. Используется при остановке бота."""
+        self._closing = True
+        if self._worker is None:
+            return
+        self._wakeup.set()
+        await self._worker
+        self._worker = None
+
+
+topic_updates = TopicUpdateQueue()